@@ -0,0 +1,134 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+
+class AsrBatcher:
+    """
+    Micro-batcher for Whisper transcription.
+    Collects concurrent requests for up to max_wait_ms (or max_batch items)
+    and transcribes them with a single ModelManager.transcribe_batch call.
+    """
+
+    def __init__(self, manager, max_batch=8, max_wait_ms=20, timeout=60):
+        self.manager = manager
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        # Upper bound on how long a request thread waits for its transcription
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="asr-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, audio_path, digest=None):
+        """
+        Queue an audio file for transcription.
+        
+        Args:
+            audio_path: Path to the audio file, or its raw bytes
+            digest: Optional content digest used for memoization
+            
+        Returns:
+            Future resolving to the transcribed text
+            
+        Raises:
+            RuntimeError: If the worker thread is no longer running
+        """
+        if not self._worker.is_alive():
+            raise RuntimeError("ASR batcher worker is not running")
+        future = Future()
+        self._queue.put((audio_path, digest, future))
+        return future
+
+    def transcribe(self, audio_path, digest=None):
+        """
+        Blocking helper: submit an audio file and wait for its transcription.
+        
+        Raises:
+            TimeoutError: If the transcription does not finish within self.timeout seconds
+        """
+        future = self.submit(audio_path, digest)
+        try:
+            return future.result(timeout=self.timeout)
+        except FuturesTimeoutError:
+            # Skipped by the worker if it has not picked the request up yet
+            future.cancel()
+            raise TimeoutError(f"Transcription did not finish within {self.timeout}s") from None
+
+    def close(self):
+        """Stop the worker thread once already queued requests are processed."""
+        self._queue.put(None)
+        self._worker.join()
+
+    def _run(self):
+        """Worker thread entry point; fails any still-queued requests when the loop exits."""
+        try:
+            self._loop()
+        finally:
+            self._fail_pending(RuntimeError("ASR batcher worker stopped"))
+
+    def _loop(self):
+        """Worker loop: drain the queue into batches and transcribe them."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+
+            # Wait briefly for more requests to share the forward pass
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            # Drop requests whose caller timed out and cancelled them
+            batch = [entry for entry in batch if entry[2].set_running_or_notify_cancel()]
+            if batch:
+                try:
+                    self._transcribe(batch)
+                except Exception as e:
+                    # Keep the worker alive; only this batch's callers see the error
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+            if stop:
+                return
+
+    def _fail_pending(self, error):
+        """Fail every request still in the queue, so no caller waits on a dead worker."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None and item[2].set_running_or_notify_cancel():
+                item[2].set_exception(error)
+
+    def _transcribe(self, batch):
+        """Run one batch, isolating failures so a bad file does not fail its neighbours."""
+        try:
+            texts = self.manager.transcribe_batch(
+                [audio_path for audio_path, _, _ in batch],
+                [digest for _, digest, _ in batch]
+            )
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][2].set_exception(e)
+                return
+            print(f"Batched transcription failed, retrying files individually: {str(e)}")
+            for entry in batch:
+                self._transcribe([entry])
+            return
+
+        for (_, _, future), text in zip(batch, texts):
+            future.set_result(text)
@@ -1,27 +1,122 @@
 import os
-import uuid
-from flask import Flask, request, jsonify
+import queue
+import hashlib
+import logging
+import itertools
+import atexit
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
+from PIL import Image
 from flask_cors import CORS
-from werkzeug.utils import secure_filename
+from flask_compress import Compress
+from werkzeug.exceptions import RequestEntityTooLarge
 from dotenv import dotenv_values
 
 # Import model manager and the new correction pipeline
-from app.backend.utils.model_manager import ModelManager
+from app.backend.utils.model_manager import get_model_manager, OUTPUT_SAMPLE_RATE
+from app.backend.utils.kokoro_voices import AVAILABLE_VOICES, VOICES_BY_LANGUAGE_FULL
+from app.backend.utils.cache import TTSCache
+from app.backend.utils.upload_utils import (
+    store_upload, read_upload, persist_upload_async, sniff, AUDIO_FORMATS
+)
+from app.backend.utils.json_provider import ORJSONProvider
+from app.backend.utils.audio_utils import wav_stream
 from app.backend.services.multimodal_pipeline import MultimodalCorrectionPipeline
+from app.backend.services.asr_batcher import AsrBatcher
 
 # Initialize Flask
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 CORS(app)
 
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting (including tracebacks) to the listener thread."""
+
+    def prepare(self, record):
+        # The queue is in-process, so the record (and its exc_info) can be passed as-is
+        return record
+
+# Handler errors are logged through a queue so traceback formatting and stderr
+# writes happen on the listener thread instead of the request thread
+_log_queue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('[%(asctime)s] %(levelname)s in %(module)s: %(message)s'))
+_log_listener = QueueListener(_log_queue, _log_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+app.logger.handlers[:] = [_DeferredQueueHandler(_log_queue)]
+app.logger.setLevel(logging.INFO)
+app.logger.propagate = False
+
 # Load environment variables
 config = dotenv_values('.env')
 app.config['SECRET_KEY'] = config.get('FLASK_SECRET_KEY', 'default-dev-key')
 app.config['UPLOAD_FOLDER'] = config.get('UPLOAD_FOLDER', 'app/uploads')
 app.config['MAX_CONTENT_LENGTH'] = int(config.get('MAX_CONTENT_LENGTH', 16 * 1000 * 1000))
+# always | auto | never — "auto" skips the Gemini verifier pass for clean answers
+app.config['CORRECTION_MODE'] = config.get('CORRECTION_MODE', 'auto').lower()
+# Whisper micro-batching: max requests per forward pass and how long to wait for them
+app.config['ASR_MAX_BATCH'] = int(config.get('ASR_MAX_BATCH', 8))
+app.config['ASR_MAX_WAIT_MS'] = int(config.get('ASR_MAX_WAIT_MS', 20))
+# Seconds a request waits for its transcription before giving up with a 504
+app.config['ASR_TIMEOUT'] = float(config.get('ASR_TIMEOUT', 60))
+
+# Response compression: Brotli when the client accepts it, gzip otherwise.
+# Only JSON is compressed; audio is already compact and is streamed as-is.
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_LEVEL'] = 4
+app.config['COMPRESS_BR_LEVEL'] = 4
+app.config['COMPRESS_MIN_SIZE'] = 512
+app.config['COMPRESS_MIMETYPES'] = ['application/json']
+Compress(app)
+
+# Frozen snapshot of hot config values, read by handlers without going through app.config
+UPLOAD_FOLDER = app.config['UPLOAD_FOLDER']
 
 # Initialize models and pipelines
-model_manager = ModelManager(upload_folder=app.config['UPLOAD_FOLDER'])
-pipeline = MultimodalCorrectionPipeline(upload_folder=app.config['UPLOAD_FOLDER'])
+model_manager = get_model_manager(UPLOAD_FOLDER)
+# Load models in the background so /api/health and /api/voices* answer immediately;
+# /api/ready reports when inference endpoints are warm. The process environment wins
+# over .env, so tests and one-off scripts can switch preloading off.
+if os.environ.get('MODEL_PRELOAD', config.get('MODEL_PRELOAD', 'true')).lower() == 'true':
+    threading.Thread(target=model_manager.preload, name="model-preload", daemon=True).start()
+asr_batcher = AsrBatcher(
+    model_manager,
+    max_batch=app.config['ASR_MAX_BATCH'],
+    max_wait_ms=app.config['ASR_MAX_WAIT_MS'],
+    timeout=app.config['ASR_TIMEOUT']
+)
+tts_cache = TTSCache(UPLOAD_FOLDER)
+pipeline = MultimodalCorrectionPipeline(
+    manager=model_manager,
+    upload_folder=UPLOAD_FOLDER,
+    tts_cache=tts_cache,
+    correction_mode=app.config['CORRECTION_MODE'],
+    asr_batcher=asr_batcher
+)
+
+# ------------------------------------------------------------------------------
+# 🛡 UPLOAD VALIDATION
+# ------------------------------------------------------------------------------
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    """Answer bodies over MAX_CONTENT_LENGTH (enforced by Flask while parsing) with a JSON 413."""
+    return jsonify({'error': 'Upload too large'}), 413
+
+def _is_audio(upload):
+    """Check an uploaded file's magic bytes against the supported audio formats."""
+    return sniff(upload.stream) in AUDIO_FORMATS
+
+def _is_image(upload):
+    """Check that an uploaded file decodes as an image, leaving the stream rewound."""
+    try:
+        Image.open(upload.stream).verify()
+        return True
+    except Exception:
+        return False
+    finally:
+        upload.stream.seek(0)
 
 # ------------------------------------------------------------------------------
 # 🧩 MAIN MULTIMODAL ANALYSIS ENDPOINT (with correction logic)
@@ -32,7 +127,7 @@ def analyze():
     Full multimodal analysis pipeline:
     1. Converts voice to text
     2. Analyzes image + text using Gemini
-    3. Corrects the analysis (sequential refinement)
+    3. Corrects the analysis when needed (see CORRECTION_MODE)
     4. Returns final corrected output (and optional TTS)
     """
     try:
@@ -41,33 +136,46 @@ def analyze():
         user_text = request.form.get('text', '')
         enable_tts = request.form.get('enable_tts', 'true').lower() == 'true'
 
-        image_path = None
-        audio_path = None
+        image_path = image_digest = None
+        audio_bytes = audio_digest = None
+
+        has_image = bool(image_file and image_file.filename)
+        has_audio = bool(audio_file and audio_file.filename)
 
-        # Save files if present
-        if image_file and image_file.filename:
-            image_filename = secure_filename(f"{uuid.uuid4()}_{image_file.filename}")
-            image_path = os.path.join(app.config['UPLOAD_FOLDER'], image_filename)
-            image_file.save(image_path)
+        # Validate everything before saving anything or touching the models
+        if has_image and not _is_image(image_file):
+            return jsonify({'error': 'Unsupported image format'}), 415
+        if has_audio and not _is_audio(audio_file):
+            return jsonify({'error': 'Unsupported audio format'}), 415
 
-        if audio_file and audio_file.filename:
-            audio_filename = secure_filename(f"{uuid.uuid4()}_{audio_file.filename}")
-            audio_path = os.path.join(app.config['UPLOAD_FOLDER'], audio_filename)
-            audio_file.save(audio_path)
+        # Save files if present (content-addressed, so repeats reuse cached results)
+        if has_image:
+            image_path, image_digest = store_upload(image_file, UPLOAD_FOLDER)
+
+        # Audio is only needed for transcription, so keep it in memory
+        if has_audio:
+            audio_bytes, audio_digest = read_upload(audio_file)
 
         # Run the multimodal correction pipeline
         results = pipeline.run(
             image_path=image_path,
-            audio_path=audio_path,
+            audio_bytes=audio_bytes,
             query_text=user_text,
-            enable_tts=enable_tts
+            enable_tts=enable_tts,
+            image_digest=image_digest,
+            audio_digest=audio_digest
         )
 
         return jsonify(results), 200
 
+    except RequestEntityTooLarge:
+        # Answered by upload_too_large
+        raise
+    except TimeoutError as e:
+        app.logger.exception("handler timed out")
+        return jsonify({'error': 'Transcription timed out', 'details': str(e)}), 504
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        app.logger.exception("handler failed")
         return jsonify({
             'error': 'An error occurred during multimodal analysis.',
             'details': str(e)
@@ -87,16 +195,24 @@ def transcribe_audio():
         if not audio_file.filename:
             return jsonify({'error': 'Empty audio filename'}), 400
 
-        audio_filename = secure_filename(f"{uuid.uuid4()}_{audio_file.filename}")
-        audio_path = os.path.join(app.config['UPLOAD_FOLDER'], audio_filename)
-        audio_file.save(audio_path)
+        if not _is_audio(audio_file):
+            return jsonify({'error': 'Unsupported audio format'}), 415
+
+        # Transcribe from memory; the copy on disk is only kept for replay
+        audio_bytes, audio_digest = read_upload(audio_file)
+        audio_path = persist_upload_async(audio_bytes, UPLOAD_FOLDER, audio_digest, audio_file.filename)
 
-        transcription = model_manager.transcribe_audio(audio_path)
+        transcription = asr_batcher.transcribe(audio_bytes, digest=audio_digest)
         return jsonify({'transcription': transcription, 'audio_path': audio_path}), 200
 
+    except RequestEntityTooLarge:
+        # Answered by upload_too_large
+        raise
+    except TimeoutError as e:
+        app.logger.exception("handler timed out")
+        return jsonify({'error': 'Transcription timed out', 'details': str(e)}), 504
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        app.logger.exception("handler failed")
         return jsonify({'error': 'Transcription failed', 'details': str(e)}), 500
 
 # ------------------------------------------------------------------------------
@@ -116,9 +232,11 @@ def generate_response():
         response_text = model_manager.process_image_and_query(image_path, query)
         return jsonify({'response': response_text}), 200
 
+    except RequestEntityTooLarge:
+        # Answered by upload_too_large
+        raise
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        app.logger.exception("handler failed")
         return jsonify({'error': 'Response generation failed', 'details': str(e)}), 500
 
 # ------------------------------------------------------------------------------
@@ -140,50 +258,105 @@ def text_to_speech():
         if high_perf:
             speed = max(speed, 1.2)
 
+        # Serve previously synthesized audio for identical requests
+        cache_key = TTSCache.make_key(text, voice, speed)
+        audio_file = tts_cache.get(cache_key)
+        if audio_file:
+            return jsonify({'audio_response': audio_file}), 200
+
         audio_file = model_manager.text_to_speech(text, voice=voice, speed=speed)
-        full_path = os.path.join(app.config['UPLOAD_FOLDER'], audio_file)
+        full_path = os.path.join(UPLOAD_FOLDER, audio_file)
 
         if not os.path.exists(full_path) or os.path.getsize(full_path) == 0:
             return jsonify({'error': 'Audio generation failed'}), 500
 
+        tts_cache.put(cache_key, audio_file)
         return jsonify({'audio_response': audio_file}), 200
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        app.logger.exception("handler failed")
         return jsonify({'error': 'TTS failed', 'details': str(e)}), 500
 
+def _logged_stream(body):
+    """
+    Pass a streamed response body through, ending it early if it fails.
+    The headers are already sent by then, so the error is logged and the
+    client gets a truncated body instead of an exception tearing down the response.
+    """
+    try:
+        yield from body
+    except Exception:
+        app.logger.exception("stream failed")
+
+@app.route('/api/text_to_speech/stream', methods=['POST'])
+def text_to_speech_stream():
+    """Stream synthesized audio as WAV while Kokoro is still generating it."""
+    try:
+        data = request.json
+        text = data.get('text')
+        voice = data.get('voice', 'af_heart')
+        speed = float(data.get('speed', 1.0))
+        high_perf = data.get('high_performance', False)
+
+        # Everything is checked up front: once streaming starts the status is already sent
+        if not text or not isinstance(text, str):
+            return jsonify({'error': 'No text provided'}), 400
+        if voice not in AVAILABLE_VOICES:
+            return jsonify({'error': f"Unknown voice '{voice}'"}), 400
+
+        if high_perf:
+            speed = max(speed, 1.2)
+
+        # Already synthesized: serve the file with Range/conditional request support
+        audio_file = tts_cache.get(TTSCache.make_key(text, voice, speed))
+        if audio_file:
+            return send_from_directory(UPLOAD_FOLDER, audio_file, mimetype='audio/wav', conditional=True)
+
+        # Generate the first chunk here, so model loading or early synthesis errors still get a 500
+        chunks = model_manager.stream_speech(text, voice=voice, speed=speed)
+        first_chunk = next(chunks, None)
+        if first_chunk is None:
+            return jsonify({'error': 'Audio generation failed'}), 500
+
+        body = wav_stream(itertools.chain([first_chunk], chunks), OUTPUT_SAMPLE_RATE)
+        return Response(stream_with_context(_logged_stream(body)), mimetype='audio/wav')
+
+    except Exception as e:
+        app.logger.exception("handler failed")
+        return jsonify({'error': 'TTS streaming failed', 'details': str(e)}), 500
+
 # ------------------------------------------------------------------------------
 # 🎧 VOICE INFORMATION ENDPOINTS
 # ------------------------------------------------------------------------------
+def _precompute_json(payload):
+    """Serialize static metadata once and derive a strong ETag from the bytes."""
+    body = app.json.dumps_bytes(payload)
+    return body, hashlib.md5(body).hexdigest()
+
+# Voice metadata never changes at runtime, so serve prebuilt bodies
+_VOICES_JSON, _VOICES_ETAG = _precompute_json(dict(AVAILABLE_VOICES))
+_VOICES_BY_LANGUAGE_JSON, _VOICES_BY_LANGUAGE_ETAG = _precompute_json(VOICES_BY_LANGUAGE_FULL)
+
+# flask-compress rewrites the ETag of compressed responses to "<etag>:br" / "<etag>:gzip",
+# and clients revalidate with that tag
+_COMPRESSED_ETAG_SUFFIXES = ('', ':br', ':gzip')
+
+def _static_json_response(body, etag):
+    """Return a precomputed JSON body, or 304 if the client already has it."""
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': 'public, max-age=86400'}
+    if any(request.if_none_match.contains_weak(etag + suffix) for suffix in _COMPRESSED_ETAG_SUFFIXES):
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype='application/json', headers=headers)
+
 @app.route('/api/voices', methods=['GET'])
 def get_voices():
     """Return available Kokoro voices."""
-    try:
-        return jsonify(model_manager.get_available_voices()), 200
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': 'Failed to get voices', 'details': str(e)}), 500
+    return _static_json_response(_VOICES_JSON, _VOICES_ETAG)
 
 @app.route('/api/voices_by_language', methods=['GET'])
 def get_voices_by_language():
     """Return voices grouped by language."""
-    try:
-        voices_data = model_manager.get_available_voices()
-        voices_by_lang = model_manager.get_voices_by_language()
-
-        response = {}
-        for lang, voice_ids in voices_by_lang.items():
-            response[lang] = [
-                {**voices_data[v_id], 'id': v_id}
-                for v_id in voice_ids if v_id in voices_data
-            ]
-        return jsonify(response), 200
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': 'Failed to group voices', 'details': str(e)}), 500
+    return _static_json_response(_VOICES_BY_LANGUAGE_JSON, _VOICES_BY_LANGUAGE_ETAG)
 
 # ------------------------------------------------------------------------------
 # ⚙️ HEALTH CHECK
@@ -193,8 +366,19 @@ def health_check():
     """Simple API health check."""
     return jsonify({'status': 'ok'}), 200
 
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Report whether the models have finished loading."""
+    if model_manager.is_ready():
+        return jsonify({'status': 'ready'}), 200
+    load_error = model_manager.load_error()
+    if load_error:
+        return jsonify({'status': 'error', 'details': load_error}), 503
+    return jsonify({'status': 'loading'}), 503
+
 # ------------------------------------------------------------------------------
 # 🚀 APP ENTRY POINT
 # ------------------------------------------------------------------------------
 if __name__ == '__main__':
-    app.run(debug=True)
+    # Development server only; use gunicorn.conf.py for production
+    app.run(debug=config.get('FLASK_DEBUG', 'false').lower() == 'true')
@@ -1,24 +1,134 @@
 import os
-from app.backend.utils.model_manager import ModelManager
+import re
+import json
+from concurrent.futures import ThreadPoolExecutor
+from app.backend.utils.model_manager import get_model_manager
+from app.backend.utils.cache import TTSCache
+
+# Hedging phrases that suggest the first answer is worth a verification pass
+HEDGING_PATTERN = re.compile(r"\b(maybe|possibly|I think|not sure|as an AI)\b", re.IGNORECASE)
+
+# Long answers are always re-checked
+CORRECTION_LENGTH_THRESHOLD = 1200
+
+# Answers longer than this are summarized before being spoken
+SUMMARY_LENGTH_THRESHOLD = 800
+
+CORRECTION_MODES = ("always", "auto", "never")
+
+JSON_FENCE_PATTERN = re.compile(r"^\s*```(?:json)?|```\s*$", re.IGNORECASE)
+
+# Shared pool for overlapping independent stages (e.g. Whisper and image reading)
+_executor = ThreadPoolExecutor(max_workers=4)
 
 class MultimodalCorrectionPipeline:
     """
     Multimodal pipeline that performs:
     1. Voice-to-text transcription (Whisper)
     2. Image + text analysis (Gemini)
-    3. Correction verification (Gemini second pass)
+    3. Correction verification (Gemini second pass, skipped for clean answers in "auto" mode)
     4. Optional TTS output (Kokoro)
     """
 
-    def __init__(self, upload_folder="app/uploads"):
-        self.manager = ModelManager(upload_folder=upload_folder)
+    def __init__(self, manager=None, upload_folder="app/uploads", tts_cache=None, correction_mode="auto",
+                 asr_batcher=None):
+        if correction_mode not in CORRECTION_MODES:
+            raise ValueError(f"CORRECTION_MODE must be one of {', '.join(CORRECTION_MODES)}, got '{correction_mode}'")
+        # Reuse the caller's ModelManager so Whisper/Kokoro/Gemini are only loaded once
+        self.manager = manager if manager else get_model_manager(upload_folder)
+        self.tts_cache = tts_cache if tts_cache else TTSCache(upload_folder)
+        self.correction_mode = correction_mode
+        # Route transcription through the shared micro-batcher when one is provided
+        self._transcribe = asr_batcher.transcribe if asr_batcher else self.manager.transcribe_audio
+
+    def _needs_correction(self, text):
+        """
+        Decide whether an initial analysis should go through the verifier pass.
+
+        Args:
+            text: Initial analysis returned by Gemini
+
+        Returns:
+            True if the second Gemini call is worth its round-trip
+        """
+        if self.correction_mode == "always":
+            return True
+        if self.correction_mode == "never":
+            return False
+        return len(text) >= CORRECTION_LENGTH_THRESHOLD or bool(HEDGING_PATTERN.search(text))
+
+    def _correct(self, initial_response):
+        """Run the Gemini verifier pass and return the corrected answer."""
+        correction_prompt = f"""
+        You are a verifier model. Review the following AI-generated response for factual accuracy and clarity.
+        Return a clear, corrected final answer only — no commentary or justification.
+        
+        Response:
+        {initial_response}
+        """
+        return self.manager.gemini_model.generate_content(correction_prompt).text
+
+    def _summarize(self, text):
+        """Shorten a long answer for audio output."""
+        summary_prompt = f"Summarize this text for audio output, keeping key points:\n{text}"
+        return self.manager.gemini_model.generate_content(summary_prompt).text
+
+    def _correct_and_summarize(self, initial_response):
+        """
+        Correct an answer and produce its TTS summary in a single Gemini call.
+        Falls back to separate correction and summarization calls if the reply
+        is not the requested JSON envelope.
 
-    def run(self, image_path=None, audio_path=None, query_text=None, enable_tts=False):
+        Args:
+            initial_response: Initial analysis to verify
+
+        Returns:
+            Tuple of (corrected answer, text to speak)
+        """
+        fused_prompt = f"""
+        You are a verifier model. Review the following AI-generated response for factual accuracy and clarity.
+        Reply with a JSON object only, with exactly these two string fields:
+        - "corrected": a clear, corrected final answer — no commentary or justification
+        - "summary_for_tts": the corrected answer in plain text, summarized for audio output if it is
+          longer than {SUMMARY_LENGTH_THRESHOLD} characters while keeping the key points
+        
+        Response:
+        {initial_response}
+        """
+        reply = self.manager.gemini_model.generate_content(fused_prompt).text
+        try:
+            # Gemini sometimes wraps JSON in a markdown code fence
+            payload = json.loads(JSON_FENCE_PATTERN.sub("", reply).strip())
+            corrected, summary = payload["corrected"], payload["summary_for_tts"]
+            if isinstance(corrected, str) and isinstance(summary, str) and corrected:
+                return corrected, summary or corrected
+        except (ValueError, TypeError, KeyError):
+            pass
+
+        print("Warning: Fused correction reply was not valid JSON, falling back to separate calls")
+        corrected = self._correct(initial_response)
+        if len(corrected) > SUMMARY_LENGTH_THRESHOLD:
+            return corrected, self._summarize(corrected)
+        return corrected, corrected
+
+    def run(self, image_path=None, audio_path=None, query_text=None, enable_tts=False,
+            voice='af_heart', speed=1.2, image_digest=None, audio_digest=None, audio_bytes=None):
         results = {}
 
+        # In-memory audio skips the disk round trip entirely
+        audio_source = audio_bytes if audio_bytes else audio_path
+
         # Step 1: Audio → Text
-        if audio_path:
-            transcribed_text = self.manager.transcribe_audio(audio_path)
+        # The image does not depend on the transcript, so read it while Whisper runs
+        image = image_path
+        if audio_source and image_path:
+            transcription_future = _executor.submit(self._transcribe, audio_source, audio_digest)
+            image_future = _executor.submit(self.manager.preprocess_image, image_path)
+            transcribed_text = transcription_future.result()
+            image = image_future.result()
+            results["transcribed_text"] = transcribed_text
+        elif audio_source:
+            transcribed_text = self._transcribe(audio_source, audio_digest)
             results["transcribed_text"] = transcribed_text
         else:
             transcribed_text = query_text or ""
@@ -26,34 +136,46 @@ class MultimodalCorrectionPipeline:
         # Step 2: Initial image + text analysis
         if image_path:
             combined_query = f"Analyze this image based on: {transcribed_text}"
-            initial_response = self.manager.process_image_and_query(image_path, combined_query)
+            initial_response = self.manager.process_image_and_query(image, combined_query, digest=image_digest)
         else:
             initial_response = f"No image provided. Analyzing text only: {transcribed_text}"
 
         results["initial_analysis"] = initial_response
 
         # Step 3: Correction / Verification (Gemini re-check)
-        correction_prompt = f"""
-        You are a verifier model. Review the following AI-generated response for factual accuracy and clarity.
-        Return a clear, corrected final answer only — no commentary or justification.
-        
-        Response:
-        {initial_response}
-        """
-        corrected_response = self.manager.gemini_model.generate_content(correction_prompt).text
+        # Without an image the "initial analysis" is only a placeholder, so the
+        # verifier pass is what actually answers the query and must always run.
+        needs_correction = not image_path or self._needs_correction(initial_response)
+        needs_summary = enable_tts and len(initial_response) > SUMMARY_LENGTH_THRESHOLD
+        speech_text = None
+
+        if enable_tts and needs_correction:
+            # One Gemini round-trip returns both the corrected answer and its spoken summary
+            corrected_response, speech_text = self._correct_and_summarize(initial_response)
+            results["correction_applied"] = True
+        elif needs_correction:
+            corrected_response = self._correct(initial_response)
+            results["correction_applied"] = True
+        else:
+            corrected_response = initial_response
+            results["correction_applied"] = False
+            if needs_summary:
+                # Shorten the spoken answer without rewriting the displayed one
+                speech_text = self._summarize(initial_response)
         results["corrected_analysis"] = corrected_response
 
-        # Step 4: Optional TTS (with summarization safeguard)
+        # Step 4: Optional TTS
         if enable_tts:
-            # If text too long, summarize it before generating speech
-            if len(corrected_response) > 800:
-                summary_prompt = f"Summarize this text for audio output, keeping key points:\n{corrected_response}"
-                corrected_response = self.manager.gemini_model.generate_content(summary_prompt).text
-                results["summary_used"] = True  # flag for debugging or display
-            else:
-                results["summary_used"] = False
-
-            audio_file = self.manager.text_to_speech(corrected_response)
+            results["summary_used"] = speech_text is not None and speech_text != corrected_response
+            if speech_text is None:
+                speech_text = corrected_response
+
+            # Reuse cached audio when the same answer has already been spoken
+            cache_key = TTSCache.make_key(speech_text, voice, speed)
+            audio_file = self.tts_cache.get(cache_key)
+            if audio_file is None:
+                audio_file = self.manager.text_to_speech(speech_text, voice=voice, speed=speed)
+                self.tts_cache.put(cache_key, audio_file)
             results["tts_audio"] = audio_file
 
         return results
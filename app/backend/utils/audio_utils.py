@@ -0,0 +1,41 @@
+import struct
+import numpy as np
+
+# Placeholder RIFF/data sizes for a WAV whose final length is unknown while streaming
+_UNKNOWN_SIZE = 0xFFFFFFFF
+
+def wav_stream_header(sample_rate, channels=1):
+    """
+    Build a 16-bit PCM WAV header for a stream of unknown length.
+    
+    Args:
+        sample_rate: Samples per second
+        channels: Number of interleaved channels
+        
+    Returns:
+        44-byte WAV header
+    """
+    bits_per_sample = 16
+    block_align = channels * bits_per_sample // 8
+    return (
+        b"RIFF" + struct.pack("<I", _UNKNOWN_SIZE) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate,
+                                sample_rate * block_align, block_align, bits_per_sample)
+        + b"data" + struct.pack("<I", _UNKNOWN_SIZE)
+    )
+
+def wav_stream(chunks, sample_rate):
+    """
+    Encode float audio chunks as a streamed 16-bit PCM WAV.
+    
+    Args:
+        chunks: Iterable of float audio arrays in [-1, 1]
+        sample_rate: Samples per second
+        
+    Yields:
+        WAV header followed by PCM bytes for each chunk
+    """
+    yield wav_stream_header(sample_rate)
+    for chunk in chunks:
+        pcm = np.clip(chunk, -1.0, 1.0) * 32767
+        yield pcm.astype("<i2").tobytes()
@@ -0,0 +1,168 @@
+import os
+import json
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+
+class TTSCache:
+    """
+    Content-addressed cache for synthesized speech.
+    Maps SHA-256(voice|speed|text) to an audio filename inside the upload folder,
+    so repeated requests can skip Kokoro synthesis entirely.
+    """
+
+    # Fallback outputs from ModelManager._fallback_tts that must never be served again
+    _UNCACHEABLE_SUFFIXES = ("_error_response.wav", "_silent_response.wav")
+
+    def __init__(self, upload_folder, max_entries=1024):
+        self.upload_folder = upload_folder
+        self.cache_dir = os.path.join(upload_folder, "tts_cache")
+        self.index_path = os.path.join(self.cache_dir, "index.json")
+        # Bounds the index (and so the cost of rewriting it); least recently used entries go first
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._index = OrderedDict(self._read_index())
+        self._index_mtime = self._index_file_mtime()
+        # Keys found stale since the last write, kept out when merging the on-disk index
+        self._stale = set()
+
+    @staticmethod
+    def make_key(text, voice, speed):
+        """
+        Build the cache key for a synthesis request.
+
+        Args:
+            text: Text to be spoken
+            voice: Voice name
+            speed: Speech speed
+
+        Returns:
+            Hex SHA-256 digest identifying the request
+        """
+        return hashlib.sha256(f"{voice}|{float(speed)}|{text}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Look up a cached audio file.
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            Audio filename relative to the upload folder, or None on a miss
+        """
+        filename = self._index.get(key)
+        if filename is None:
+            # Another worker may have populated the shared index; only reread it if it changed
+            with self._lock:
+                self._merge_disk_index()
+                filename = self._index.get(key)
+            if filename is None:
+                return None
+
+        full_path = os.path.join(self.upload_folder, filename)
+        if not os.path.exists(full_path) or os.path.getsize(full_path) == 0:
+            # The uploads folder is wiped on startup/exit, so entries can go stale
+            with self._lock:
+                self._index.pop(key, None)
+                self._stale.add(key)
+            return None
+
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+        return filename
+
+    def put(self, key, filename):
+        """
+        Record a freshly synthesized audio file under the given key.
+
+        Args:
+            key: Cache key from make_key
+            filename: Audio filename relative to the upload folder
+        """
+        if not filename or filename.endswith(self._UNCACHEABLE_SUFFIXES):
+            return
+
+        with self._lock:
+            # Merge with the on-disk index so entries written by other workers survive
+            self._merge_disk_index()
+            self._stale.discard(key)
+            self._index[key] = filename
+            self._index.move_to_end(key)
+            while len(self._index) > self.max_entries:
+                self._index.popitem(last=False)
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{self.index_path}.{uuid.uuid4().hex}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(self._index, f)
+                os.replace(tmp_path, self.index_path)
+            except OSError as e:
+                print(f"Warning: Could not persist TTS cache index: {str(e)}")
+                return
+            # The stale keys are gone from disk now, so they no longer need filtering
+            self._stale.clear()
+            self._index_mtime = self._index_file_mtime()
+
+    def _merge_disk_index(self):
+        """Fold in entries other workers wrote since the last read (call with the lock held)."""
+        mtime = self._index_file_mtime()
+        if mtime is None or mtime == self._index_mtime:
+            return
+        self._index_mtime = mtime
+        merged = OrderedDict(
+            (key, filename) for key, filename in self._read_index().items()
+            if key not in self._stale and key not in self._index
+        )
+        # Local entries are the most recently used, so they stay at the end
+        merged.update(self._index)
+        self._index = merged
+
+    def _index_file_mtime(self):
+        """
+        Return a stamp that changes whenever the on-disk index is rewritten, or None if it does not exist.
+        Each write replaces the file, so the inode number catches rewrites within one mtime tick.
+        """
+        try:
+            stat = os.stat(self.index_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_ino
+
+    def _read_index(self):
+        """Load the on-disk index, treating a missing or corrupt file as empty."""
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return index if isinstance(index, dict) else {}
+
+class LRUCache:
+    """
+    Small thread-safe in-memory LRU map, used to memoize model outputs
+    keyed by upload content digests.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for key (marking it recently used), or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
@@ -0,0 +1,37 @@
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+class ORJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson.
+    Encodes straight to bytes, so jsonify() skips the str round-trip of the stdlib encoder.
+    """
+
+    def _options(self):
+        """orjson flags equivalent to the provider's settings."""
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def dumps_bytes(self, obj):
+        """
+        Serialize an object to UTF-8 JSON bytes.
+        
+        Args:
+            obj: Object to serialize
+            
+        Returns:
+            JSON bytes
+        """
+        return orjson.dumps(obj, default=self.default, option=self._options())
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
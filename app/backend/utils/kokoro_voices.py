@@ -4,80 +4,105 @@ including available voices and their organization by language.
 Source: https://huggingface.co/hexgrad/Kokoro-82M/blob/main/VOICES.md
 '''
 
+import sys
+from types import MappingProxyType
+from collections import defaultdict
+
 # Kokoro TTS voices metadata
 # Source: https://huggingface.co/hexgrad/Kokoro-82M/blob/main/VOICES.md
 
+# Shared interned strings, so every record points at the same language/gender objects
+LANG_AMERICAN_ENGLISH = sys.intern("American English")
+LANG_BRITISH_ENGLISH = sys.intern("British English")
+LANG_JAPANESE = sys.intern("Japanese")
+LANG_MANDARIN_CHINESE = sys.intern("Mandarin Chinese")
+LANG_SPANISH = sys.intern("Spanish")
+LANG_FRENCH = sys.intern("French")
+LANG_HINDI = sys.intern("Hindi")
+LANG_ITALIAN = sys.intern("Italian")
+LANG_BRAZILIAN_PORTUGUESE = sys.intern("Brazilian Portuguese")
+GENDER_FEMALE = sys.intern("Female")
+GENDER_MALE = sys.intern("Male")
+
 AVAILABLE_VOICES = {
     # American English (lang_code='a')
-    "af_heart": {"name": "Heart", "language": "American English", "gender": "Female"},
-    "af_alloy": {"name": "Alloy", "language": "American English", "gender": "Female"},
-    "af_aoede": {"name": "Aoede", "language": "American English", "gender": "Female"},
-    "af_bella": {"name": "Bella", "language": "American English", "gender": "Female"},
-    "af_jessica": {"name": "Jessica", "language": "American English", "gender": "Female"},
-    "af_kore": {"name": "Kore", "language": "American English", "gender": "Female"},
-    "af_nicole": {"name": "Nicole", "language": "American English", "gender": "Female"},
-    "af_nova": {"name": "Nova", "language": "American English", "gender": "Female"},
-    "af_river": {"name": "River", "language": "American English", "gender": "Female"},
-    "af_sarah": {"name": "Sarah", "language": "American English", "gender": "Female"},
-    "af_sky": {"name": "Sky", "language": "American English", "gender": "Female"},
-    "am_adam": {"name": "Adam", "language": "American English", "gender": "Male"},
-    "am_echo": {"name": "Echo", "language": "American English", "gender": "Male"},
-    "am_eric": {"name": "Eric", "language": "American English", "gender": "Male"},
-    "am_fenrir": {"name": "Fenrir", "language": "American English", "gender": "Male"},
-    "am_liam": {"name": "Liam", "language": "American English", "gender": "Male"},
-    "am_michael": {"name": "Michael", "language": "American English", "gender": "Male"},
-    "am_onyx": {"name": "Onyx", "language": "American English", "gender": "Male"},
-    "am_puck": {"name": "Puck", "language": "American English", "gender": "Male"},
-    "am_santa": {"name": "Santa", "language": "American English", "gender": "Male"},
+    "af_heart": {"name": "Heart", "language": LANG_AMERICAN_ENGLISH, "gender": GENDER_FEMALE},
+    "af_alloy": {"name": "Alloy", "language": LANG_AMERICAN_ENGLISH, "gender": GENDER_FEMALE},
+    "af_aoede": {"name": "Aoede", "language": LANG_AMERICAN_ENGLISH, "gender": GENDER_FEMALE},
+    "af_bella": {"name": "Bella", "language": LANG_AMERICAN_ENGLISH, "gender": GENDER_FEMALE},
+    "af_jessica": {"name": "Jessica", "language": LANG_AMERICAN_ENGLISH, "gender": GENDER_FEMALE},
+    "af_kore": {"name": "Kore", "language": LANG_AMERICAN_ENGLISH, "gender": GENDER_FEMALE},
+    "af_nicole": {"name": "Nicole", "language": LANG_AMERICAN_ENGLISH, "gender": GENDER_FEMALE},
+    "af_nova": {"name": "Nova", "language": LANG_AMERICAN_ENGLISH, "gender": GENDER_FEMALE},
+    "af_river": {"name": "River", "language": LANG_AMERICAN_ENGLISH, "gender": GENDER_FEMALE},
+    "af_sarah": {"name": "Sarah", "language": LANG_AMERICAN_ENGLISH, "gender": GENDER_FEMALE},
+    "af_sky": {"name": "Sky", "language": LANG_AMERICAN_ENGLISH, "gender": GENDER_FEMALE},
+    "am_adam": {"name": "Adam", "language": LANG_AMERICAN_ENGLISH, "gender": GENDER_MALE},
+    "am_echo": {"name": "Echo", "language": LANG_AMERICAN_ENGLISH, "gender": GENDER_MALE},
+    "am_eric": {"name": "Eric", "language": LANG_AMERICAN_ENGLISH, "gender": GENDER_MALE},
+    "am_fenrir": {"name": "Fenrir", "language": LANG_AMERICAN_ENGLISH, "gender": GENDER_MALE},
+    "am_liam": {"name": "Liam", "language": LANG_AMERICAN_ENGLISH, "gender": GENDER_MALE},
+    "am_michael": {"name": "Michael", "language": LANG_AMERICAN_ENGLISH, "gender": GENDER_MALE},
+    "am_onyx": {"name": "Onyx", "language": LANG_AMERICAN_ENGLISH, "gender": GENDER_MALE},
+    "am_puck": {"name": "Puck", "language": LANG_AMERICAN_ENGLISH, "gender": GENDER_MALE},
+    "am_santa": {"name": "Santa", "language": LANG_AMERICAN_ENGLISH, "gender": GENDER_MALE},
     # British English (lang_code='b')
-    "bf_alice": {"name": "Alice", "language": "British English", "gender": "Female"},
-    "bf_emma": {"name": "Emma", "language": "British English", "gender": "Female"},
-    "bf_isabella": {"name": "Isabella", "language": "British English", "gender": "Female"},
-    "bf_lily": {"name": "Lily", "language": "British English", "gender": "Female"},
-    "bm_daniel": {"name": "Daniel", "language": "British English", "gender": "Male"},
-    "bm_fable": {"name": "Fable", "language": "British English", "gender": "Male"},
-    "bm_george": {"name": "George", "language": "British English", "gender": "Male"},
-    "bm_lewis": {"name": "Lewis", "language": "British English", "gender": "Male"},
+    "bf_alice": {"name": "Alice", "language": LANG_BRITISH_ENGLISH, "gender": GENDER_FEMALE},
+    "bf_emma": {"name": "Emma", "language": LANG_BRITISH_ENGLISH, "gender": GENDER_FEMALE},
+    "bf_isabella": {"name": "Isabella", "language": LANG_BRITISH_ENGLISH, "gender": GENDER_FEMALE},
+    "bf_lily": {"name": "Lily", "language": LANG_BRITISH_ENGLISH, "gender": GENDER_FEMALE},
+    "bm_daniel": {"name": "Daniel", "language": LANG_BRITISH_ENGLISH, "gender": GENDER_MALE},
+    "bm_fable": {"name": "Fable", "language": LANG_BRITISH_ENGLISH, "gender": GENDER_MALE},
+    "bm_george": {"name": "George", "language": LANG_BRITISH_ENGLISH, "gender": GENDER_MALE},
+    "bm_lewis": {"name": "Lewis", "language": LANG_BRITISH_ENGLISH, "gender": GENDER_MALE},
     # Japanese (lang_code='j')
-    "jf_alpha": {"name": "Alpha", "language": "Japanese", "gender": "Female"},
-    "jf_gongitsune": {"name": "Gongitsune", "language": "Japanese", "gender": "Female"},
-    "jf_nezumi": {"name": "Nezumi", "language": "Japanese", "gender": "Female"},
-    "jf_tebukuro": {"name": "Tebukuro", "language": "Japanese", "gender": "Female"},
-    "jm_kumo": {"name": "Kumo", "language": "Japanese", "gender": "Male"},
+    "jf_alpha": {"name": "Alpha", "language": LANG_JAPANESE, "gender": GENDER_FEMALE},
+    "jf_gongitsune": {"name": "Gongitsune", "language": LANG_JAPANESE, "gender": GENDER_FEMALE},
+    "jf_nezumi": {"name": "Nezumi", "language": LANG_JAPANESE, "gender": GENDER_FEMALE},
+    "jf_tebukuro": {"name": "Tebukuro", "language": LANG_JAPANESE, "gender": GENDER_FEMALE},
+    "jm_kumo": {"name": "Kumo", "language": LANG_JAPANESE, "gender": GENDER_MALE},
     # Mandarin Chinese (lang_code='z')
-    "zf_xiaobei": {"name": "Xiaobei", "language": "Mandarin Chinese", "gender": "Female"},
-    "zf_xiaoni": {"name": "Xiaoni", "language": "Mandarin Chinese", "gender": "Female"},
-    "zf_xiaoxiao": {"name": "Xiaoxiao", "language": "Mandarin Chinese", "gender": "Female"},
-    "zf_xiaoyi": {"name": "Xiaoyi", "language": "Mandarin Chinese", "gender": "Female"},
-    "zm_yunjian": {"name": "Yunjian", "language": "Mandarin Chinese", "gender": "Male"},
-    "zm_yunxi": {"name": "Yunxi", "language": "Mandarin Chinese", "gender": "Male"},
-    "zm_yunxia": {"name": "Yunxia", "language": "Mandarin Chinese", "gender": "Male"},
-    "zm_yunyang": {"name": "Yunyang", "language": "Mandarin Chinese", "gender": "Male"},
+    "zf_xiaobei": {"name": "Xiaobei", "language": LANG_MANDARIN_CHINESE, "gender": GENDER_FEMALE},
+    "zf_xiaoni": {"name": "Xiaoni", "language": LANG_MANDARIN_CHINESE, "gender": GENDER_FEMALE},
+    "zf_xiaoxiao": {"name": "Xiaoxiao", "language": LANG_MANDARIN_CHINESE, "gender": GENDER_FEMALE},
+    "zf_xiaoyi": {"name": "Xiaoyi", "language": LANG_MANDARIN_CHINESE, "gender": GENDER_FEMALE},
+    "zm_yunjian": {"name": "Yunjian", "language": LANG_MANDARIN_CHINESE, "gender": GENDER_MALE},
+    "zm_yunxi": {"name": "Yunxi", "language": LANG_MANDARIN_CHINESE, "gender": GENDER_MALE},
+    "zm_yunxia": {"name": "Yunxia", "language": LANG_MANDARIN_CHINESE, "gender": GENDER_MALE},
+    "zm_yunyang": {"name": "Yunyang", "language": LANG_MANDARIN_CHINESE, "gender": GENDER_MALE},
     # Spanish (lang_code='e')
-    "ef_dora": {"name": "Dora", "language": "Spanish", "gender": "Female"},
-    "em_alex": {"name": "Alex", "language": "Spanish", "gender": "Male"},
-    "em_santa": {"name": "Santa", "language": "Spanish", "gender": "Male"},
+    "ef_dora": {"name": "Dora", "language": LANG_SPANISH, "gender": GENDER_FEMALE},
+    "em_alex": {"name": "Alex", "language": LANG_SPANISH, "gender": GENDER_MALE},
+    "em_santa": {"name": "Santa", "language": LANG_SPANISH, "gender": GENDER_MALE},
     # French (lang_code='f')
-    "ff_siwis": {"name": "Siwis", "language": "French", "gender": "Female"},
+    "ff_siwis": {"name": "Siwis", "language": LANG_FRENCH, "gender": GENDER_FEMALE},
     # Hindi (lang_code='h')
-    "hf_alpha": {"name": "Alpha", "language": "Hindi", "gender": "Female"},
-    "hf_beta": {"name": "Beta", "language": "Hindi", "gender": "Female"},
-    "hm_omega": {"name": "Omega", "language": "Hindi", "gender": "Male"},
-    "hm_psi": {"name": "Psi", "language": "Hindi", "gender": "Male"},
+    "hf_alpha": {"name": "Alpha", "language": LANG_HINDI, "gender": GENDER_FEMALE},
+    "hf_beta": {"name": "Beta", "language": LANG_HINDI, "gender": GENDER_FEMALE},
+    "hm_omega": {"name": "Omega", "language": LANG_HINDI, "gender": GENDER_MALE},
+    "hm_psi": {"name": "Psi", "language": LANG_HINDI, "gender": GENDER_MALE},
     # Italian (lang_code='i')
-    "if_sara": {"name": "Sara", "language": "Italian", "gender": "Female"},
-    "im_nicola": {"name": "Nicola", "language": "Italian", "gender": "Male"},
+    "if_sara": {"name": "Sara", "language": LANG_ITALIAN, "gender": GENDER_FEMALE},
+    "im_nicola": {"name": "Nicola", "language": LANG_ITALIAN, "gender": GENDER_MALE},
     # Brazilian Portuguese (lang_code='p')
-    "pf_dora": {"name": "Dora", "language": "Brazilian Portuguese", "gender": "Female"},
-    "pm_alex": {"name": "Alex", "language": "Brazilian Portuguese", "gender": "Male"},
-    "pm_santa": {"name": "Santa", "language": "Brazilian Portuguese", "gender": "Male"},
+    "pf_dora": {"name": "Dora", "language": LANG_BRAZILIAN_PORTUGUESE, "gender": GENDER_FEMALE},
+    "pm_alex": {"name": "Alex", "language": LANG_BRAZILIAN_PORTUGUESE, "gender": GENDER_MALE},
+    "pm_santa": {"name": "Santa", "language": LANG_BRAZILIAN_PORTUGUESE, "gender": GENDER_MALE},
 }
 
+# Read-only view: the voice table is static and shared across threads
+AVAILABLE_VOICES = MappingProxyType(AVAILABLE_VOICES)
+
 # Dynamically generate VOICES_BY_LANGUAGE from AVAILABLE_VOICES
-VOICES_BY_LANGUAGE = {}
+_voices_by_language = defaultdict(list)
 for voice_id, voice_info in AVAILABLE_VOICES.items():
     language = voice_info.get("language")
     if language:
-        if language not in VOICES_BY_LANGUAGE:
-            VOICES_BY_LANGUAGE[language] = []
-        VOICES_BY_LANGUAGE[language].append(voice_id) 
\ No newline at end of file
+        _voices_by_language[language].append(voice_id)
+VOICES_BY_LANGUAGE = dict(_voices_by_language)
+
+# Per-language voice records with ids, precomputed once for the /api/voices_by_language endpoint
+VOICES_BY_LANGUAGE_FULL = {
+    language: [{"id": voice_id, **AVAILABLE_VOICES[voice_id]} for voice_id in voice_ids]
+    for language, voice_ids in VOICES_BY_LANGUAGE.items()
+}
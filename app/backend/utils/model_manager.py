@@ -1,20 +1,24 @@
 import os
-import torch
-import google.generativeai as genai
-from transformers import WhisperProcessor, WhisperForConditionalGeneration
+import io
 import soundfile as sf
-from PIL import Image
 import numpy as np
 import uuid
+import hashlib
 from dotenv import load_dotenv, dotenv_values
-from scipy.signal import resample
-from kokoro import KPipeline
+from math import gcd
 from huggingface_hub import hf_hub_download
 import warnings
 import re
-import concurrent.futures
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from app.backend.utils.kokoro_voices import AVAILABLE_VOICES, VOICES_BY_LANGUAGE
 from app.backend.utils.text_utils import clean_text_for_tts
+from app.backend.utils.cache import LRUCache
+from app.backend.utils.upload_utils import sniff, IMAGE_MIME_TYPES
+
+# torch, transformers, kokoro, scipy and google.generativeai are imported where they
+# are first used, so importing this module (e.g. for health or voice endpoints) stays cheap
 
 # Load environment variables
 load_dotenv()
@@ -27,6 +31,49 @@ warnings.filterwarnings("ignore", message="`resume_download` is deprecated")
 # Suppress Whisper language detection/translation warning (see https://github.com/huggingface/transformers/pull/28687)
 warnings.filterwarnings("ignore", message=".*transcription using a multilingual Whisper will default to language detection.*")
 
+# Use a lower sample rate for faster processing (was 24000)
+OUTPUT_SAMPLE_RATE = 22050  # Still good quality but slightly faster
+
+# Characters that start any markdown/LaTeX construct clean_text_for_tts handles
+# ('**', '__', '```' and '![' are covered by their first or last character)
+_SPECIAL_CHARS = frozenset('$*_#`[')
+
+# Image formats Gemini accepts inline; other sniffed images are re-encoded as PNG
+_GEMINI_IMAGE_FORMATS = frozenset({"png", "jpeg", "webp"})
+
+def join_audio(chunks):
+    """
+    Join audio chunks into one float32 buffer with a single allocation.
+    
+    Args:
+        chunks: Sequence of 1-D audio arrays (or tensors)
+        
+    Returns:
+        Float32 array holding all chunks back to back
+    """
+    full_audio = np.empty(sum(len(chunk) for chunk in chunks), dtype=np.float32)
+    offset = 0
+    for chunk in chunks:
+        full_audio[offset:offset + len(chunk)] = chunk
+        offset += len(chunk)
+    return full_audio
+
+@functools.lru_cache(maxsize=None)
+def configure_torch_threads():
+    """
+    Size PyTorch's intra-op pool to the machine (or TORCH_NUM_THREADS) and use a
+    single inter-op thread, since each request already runs on its own thread.
+    Runs once per process.
+    """
+    import torch
+
+    torch.set_num_threads(int(config.get("TORCH_NUM_THREADS", max(1, os.cpu_count() or 1))))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set once, before any inter-op parallel work has started
+        pass
+
 def ensure_kokoro_assets(model_dir="app/backend/kokoro_assets"):
     """Download and ensure Kokoro model files are available."""
     os.makedirs(model_dir, exist_ok=True)
@@ -51,7 +98,7 @@ def ensure_kokoro_assets(model_dir="app/backend/kokoro_assets"):
     # Download all voice files into voices/voices/
     nested_voices_dir = os.path.join(voices_dir, "voices")
     os.makedirs(nested_voices_dir, exist_ok=True)
-    for voice_file in voice_files:
+    def download_voice(voice_file):
         voice_path = os.path.join(nested_voices_dir, voice_file)
         if not os.path.exists(voice_path):
             try:
@@ -66,6 +113,10 @@ def ensure_kokoro_assets(model_dir="app/backend/kokoro_assets"):
             except Exception as e:
                 print(f"Warning: Could not download {voice_file}: {str(e)}")
     
+    # Voice files are small, so overlap their round trips instead of fetching one at a time
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(download_voice, voice_files))
+    
     return model_path, config_path, voices_dir
 
 class ModelManager:
@@ -74,20 +125,143 @@ class ModelManager:
     Manages STT, TTS, and multimodal NLP models.
     """
     
+    # Detailed instruction prompt for image analysis; only the query varies per request
+    _IMAGE_PROMPT_TEMPLATE = """
+        You are an AI assistant specialized in analyzing images and providing detailed, accurate answers about them.
+        
+        Please analyze the image and answer this question: {query}
+        
+        Guidelines:
+        - Be detailed and descriptive in your explanation
+        - If the answer is not apparent from the image, acknowledge the limitation
+        - If there are ambiguities, mention them
+        - Use a conversational, helpful tone
+        - Focus on providing factual information
+        - If the question asks for calculations or text extraction, perform them accurately
+        - IMPORTANT: Format your response as plain text without markdown formatting
+        - For emphasis, use natural language indicators like "importantly" or "note that" instead of bold or italics
+        - For mathematical expressions, write them in a way that can be easily read aloud (e.g., "x squared plus 2x equals 10")
+        - Avoid using special characters like asterisks, underscores, dollar signs, or backticks for formatting
+        """
+    
     def __init__(self, upload_folder=None):
-        """Initialize the model manager with all required models."""
+        """
+        Initialize the model manager.
+        Models are loaded lazily on first use; call preload() to warm them up front.
+        """
         self.upload_folder = upload_folder if upload_folder else config.get("UPLOAD_FOLDER", "app/uploads")
+        # Output paths are built by plain concatenation on the TTS hot path
+        self._upload_dir = os.path.join(os.fspath(self.upload_folder), "")
         # Configure Google API
         api_key = config.get("GOOGLE_API_KEY")
         if not api_key:
             raise ValueError("GOOGLE_API_KEY is not set in .env file")
-        genai.configure(api_key=api_key)
+        self._api_key = api_key
+
+        # "transformers" (PyTorch Whisper) or "faster-whisper" (CTranslate2, int8 by default)
+        self.stt_backend = config.get("STT_BACKEND", "transformers").lower()
+        if self.stt_backend not in ("transformers", "faster-whisper"):
+            raise ValueError(f"STT_BACKEND must be 'transformers' or 'faster-whisper', got '{self.stt_backend}'")
+        # Whisper weights precision: float32 (default) or bfloat16 (CPUs with AVX512-BF16/AMX).
+        # The model always runs on CPU, where float16 matmuls are unsupported or very slow.
+        self.stt_dtype = config.get("STT_DTYPE", "float32").lower()
+        if self.stt_dtype not in ("float32", "bfloat16"):
+            raise ValueError(f"STT_DTYPE must be float32 or bfloat16, got '{self.stt_dtype}'")
+
+        # Serializes model loading so concurrent first requests load each model once
+        self._load_lock = threading.RLock()
+        self._ready = threading.Event()
+        # Set by preload() when a model fails to load, so readiness checks can report it
+        self._load_error = None
+
+        # Local voice files downloaded by ensure_kokoro_assets
+        self.voices_dir = os.path.join(config.get("KOKORO_ASSETS_DIR", "app/backend/kokoro_assets"), "voices", "voices")
+        # Local voice file path per known voice, so TTS requests do not stat the voices folder every time
+        self._voice_cache = {}
+
+        # Memoized results keyed by upload content digest
+        self._transcriptions = LRUCache()
+        self._image_analyses = LRUCache()
+
+    def _load_once(self, name, loader):
+        """
+        Load a model under the load lock unless another thread already did.
+        
+        Args:
+            name: Attribute name the cached_property stores the model under
+            loader: Zero-argument callable that loads the model
+            
+        Returns:
+            The loaded model
+        """
+        with self._load_lock:
+            if name in self.__dict__:
+                return self.__dict__[name]
+            # Store before releasing the lock so a thread waiting on it finds the model
+            value = self.__dict__[name] = loader()
+            return value
+
+    @functools.cached_property
+    def stt_processor(self):
+        """Whisper processor (feature extractor + tokenizer) for STT."""
+        stt_model_name = config.get("STT_MODEL", "openai/whisper-tiny")
+        return self._load_once("stt_processor", lambda: self._load_whisper_processor(stt_model_name))
 
-        # Initialize Whisper model for STT
+    @functools.cached_property
+    def stt_model(self):
+        """Whisper model for STT."""
         stt_model_name = config.get("STT_MODEL", "openai/whisper-tiny")
-        self.stt_processor = WhisperProcessor.from_pretrained(stt_model_name)
-        self.stt_model = WhisperForConditionalGeneration.from_pretrained(stt_model_name)
+        return self._load_once("stt_model", lambda: self._load_whisper_model(stt_model_name))
+
+    def _load_whisper_processor(self, stt_model_name):
+        """Load the Whisper feature extractor + tokenizer."""
+        from transformers import WhisperProcessor
+
+        return WhisperProcessor.from_pretrained(stt_model_name)
+
+    def _load_whisper_model(self, stt_model_name):
+        """Load Whisper in eval mode, optionally in bfloat16 with a compiled encoder."""
+        import torch
+        from transformers import WhisperForConditionalGeneration
+
+        configure_torch_threads()
+        model = WhisperForConditionalGeneration.from_pretrained(stt_model_name).eval()
+        if self.stt_dtype != "float32":
+            model = model.to(dtype=getattr(torch, self.stt_dtype))
+        if config.get("STT_COMPILE", "false").lower() == "true":
+            # Only the encoder: the decoder's generation loop has data-dependent control flow
+            model.model.encoder = torch.compile(model.model.encoder, mode="reduce-overhead", fullgraph=False)
+        return model
+
+    @functools.cached_property
+    def fw_model(self):
+        """faster-whisper model, used when STT_BACKEND=faster-whisper."""
+        return self._load_once("fw_model", self._load_faster_whisper)
+
+    def _load_faster_whisper(self):
+        """Build the CTranslate2 Whisper model (optional dependency)."""
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise ImportError("STT_BACKEND=faster-whisper requires the faster-whisper package") from e
+        return WhisperModel(
+            config.get("FASTER_WHISPER_MODEL", "tiny"),
+            device=config.get("FASTER_WHISPER_DEVICE", "cpu"),
+            # int8 on CPU; int8_float16 is a good choice on GPU
+            compute_type=config.get("FASTER_WHISPER_COMPUTE_TYPE", "int8"),
+            cpu_threads=os.cpu_count() or 0
+        )
+
+    @functools.cached_property
+    def kokoro_pipeline(self):
+        """Kokoro TTS pipeline, downloading its assets first if they are missing."""
+        return self._load_once("kokoro_pipeline", self._load_kokoro)
+
+    def _load_kokoro(self):
+        """Ensure Kokoro assets are present and build the TTS pipeline."""
+        from kokoro import KPipeline
 
+        configure_torch_threads()
         # Ensure Kokoro model files are present (auto-download if missing)
         kokoro_model_dir = config.get("KOKORO_ASSETS_DIR", "app/backend/kokoro_assets")
         model_path, config_path, voices_dir = ensure_kokoro_assets(model_dir=kokoro_model_dir)
@@ -95,45 +269,174 @@ class ModelManager:
         os.environ["KOKORO_PATH"] = os.path.abspath(kokoro_model_dir)
         # Initialize Kokoro TTS pipeline
         kokoro_repo_id = config.get("KOKORO_REPO_ID", "hexgrad/Kokoro-82M")
-        self.kokoro_pipeline = KPipeline(
+        return KPipeline(
             lang_code='a',
             repo_id=kokoro_repo_id
         )
 
-        # Configure Gemini model
+    @functools.cached_property
+    def gemini_model(self):
+        """Gemini model for image + text analysis."""
         gemini_model_name = config.get("GEMINI_MODEL", "gemini-2.5-flash-preview-05-20")
-        self.gemini_model = genai.GenerativeModel(gemini_model_name)
+        return self._load_once("gemini_model", lambda: self._load_gemini(gemini_model_name))
+
+    def _load_gemini(self, gemini_model_name):
+        """Configure the Google API client and build the Gemini model."""
+        import google.generativeai as genai
+
+        genai.configure(api_key=self._api_key)
+        return genai.GenerativeModel(gemini_model_name)
+
+    def preload(self):
+        """Load every model now instead of on first use (safe to run in a background thread)."""
+        try:
+            if self.stt_backend == "faster-whisper":
+                self.fw_model
+            else:
+                self.stt_processor
+                self.stt_model
+            self.kokoro_pipeline
+            self.gemini_model
+        except Exception as e:
+            # Runs in a daemon thread, so an uncaught error would leave readiness stuck on "loading"
+            print(f"Error loading models: {str(e)}")
+            self._load_error = str(e)
+            return
+        self._load_error = None
         print("All models loaded successfully")
+        # Opt-in so dev reloads are not slowed down
+        if config.get("MM_WARMUP", "0") == "1":
+            self._warmup()
+        self._ready.set()
+
+    def _warmup(self):
+        """Run one dummy STT and TTS pass so the first real request skips lazy init costs."""
+        try:
+            silence = np.zeros(16000, dtype=np.float32)
+            if self.stt_backend == "faster-whisper":
+                segments, _ = self.fw_model.transcribe(silence, language="en", beam_size=1)
+                list(segments)
+            else:
+                import torch
+
+                input_features = self.stt_processor(silence, sampling_rate=16000, return_tensors="pt").input_features
+                with torch.inference_mode():
+                    self.stt_model.generate(input_features.to(dtype=self.stt_model.dtype), max_new_tokens=1)
+            _, use_voice = self._prepare_tts("hi", "af_heart")
+            for _ in self.kokoro_pipeline("hi", voice=use_voice, speed=1.2):
+                pass
+            print("Model warmup complete")
+        except Exception as e:
+            print(f"Warning: Model warmup failed: {str(e)}")
+
+    def is_ready(self):
+        """
+        Report whether preload() has finished.
+        
+        Returns:
+            True once all models are loaded
+        """
+        return self._ready.is_set()
+
+    def load_error(self):
+        """
+        Report why preload() failed, if it did.
+        
+        Returns:
+            The error message, or None if no model failed to load
+        """
+        return self._load_error
 
-    def transcribe_audio(self, audio_path):
+    def transcribe_audio(self, audio_path, digest=None):
         """
         Transcribe audio using Whisper model.
         
         Args:
             audio_path: Path to the audio file
+            digest: Optional content digest of the file; when given, the
+                transcription is memoized under it
             
         Returns:
             Transcribed text
         """
-        # Load audio
-        audio_array, sampling_rate = sf.read(audio_path)
+        return self.transcribe_batch([audio_path], [digest])[0]
+    
+    def transcribe_bytes(self, raw, digest=None):
+        """
+        Transcribe an in-memory audio file without writing it to disk.
         
-        # Resample audio to 16000 Hz if necessary
-        if sampling_rate != 16000:
-            num_samples = round(len(audio_array) * 16000 / sampling_rate)
-            audio_array = resample(audio_array, num_samples)
-            sampling_rate = 16000
-        
-        # Process audio with Whisper
-        input_features = self.stt_processor(
-            audio_array, 
-            sampling_rate=sampling_rate, 
+        Args:
+            raw: Encoded audio file contents (WAV, FLAC, Ogg, ...)
+            digest: Optional content digest used for memoization
+            
+        Returns:
+            Transcribed text
+        """
+        return self.transcribe_batch([raw], [digest])[0]
+    
+    def transcribe_batch(self, audio_paths, digests=None):
+        """
+        Transcribe several audio files with a single Whisper forward pass.
+        
+        Args:
+            audio_paths: Paths to the audio files (raw bytes are also accepted)
+            digests: Optional content digests (one per path, or None entries);
+                cached transcriptions are reused and new ones memoized
+            
+        Returns:
+            List of transcribed texts, in the same order as audio_paths
+        """
+        digests = digests or [None] * len(audio_paths)
+        transcriptions = [self._transcriptions.get(d) if d else None for d in digests]
+        pending = [i for i, text in enumerate(transcriptions) if text is None]
+        if not pending:
+            return transcriptions
+        
+        sources = [audio_paths[i] for i in pending]
+        if self.stt_backend == "faster-whisper":
+            decoded = self._transcribe_faster_whisper(sources)
+        else:
+            decoded = self._transcribe_transformers(sources)
+        
+        for i, transcription in zip(pending, decoded):
+            transcriptions[i] = transcription
+            if digests[i]:
+                self._transcriptions.put(digests[i], transcription)
+        return transcriptions
+    
+    def _transcribe_transformers(self, sources):
+        """
+        Transcribe audio with the Hugging Face Whisper model in one batched generate call.
+        
+        Args:
+            sources: Audio file paths or raw bytes
+            
+        Returns:
+            List of transcribed texts
+        """
+        import torch
+
+        # Empty recordings have nothing to transcribe; keep them out of the
+        # encoder batch, which always runs on a full 30 s window per item
+        audio_arrays = [self._load_audio(source) for source in sources]
+        transcriptions = [""] * len(audio_arrays)
+        non_empty = [i for i, audio in enumerate(audio_arrays) if len(audio) > 0]
+        if not non_empty:
+            return transcriptions
+        
+        # Compute log-mel features with the feature extractor directly: its mel
+        # filterbank is built once at load time, and going through the processor
+        # only adds dispatch (the processor forwarded language="en" to it, where it was ignored)
+        input_features = self.stt_processor.feature_extractor(
+            [audio_arrays[i] for i in non_empty], 
+            sampling_rate=16000, 
             return_tensors="pt",
-            # Explicitly set language to English to address the warning
-            language="en"
+            return_attention_mask=False
         ).input_features
 
-        # Pad or truncate input_features to length 3000 (required by Whisper)
+        # Pad or truncate input_features to length 3000. The Hugging Face Whisper
+        # encoder rejects any other length, so short clips cannot be encoded on a
+        # shorter window here (STT_BACKEND=faster-whisper plus its VAD is the option for that)
         required_length = 3000
         seq_len = input_features.shape[-1]
         if seq_len > required_length:
@@ -142,197 +445,272 @@ class ModelManager:
             pad_width = required_length - seq_len
             input_features = torch.nn.functional.pad(input_features, (0, pad_width))
         
-        # Generate transcription
-        predicted_ids = self.stt_model.generate(input_features)
-        transcription = self.stt_processor.batch_decode(
+        # Match the model's precision (see STT_DTYPE)
+        input_features = input_features.to(dtype=self.stt_model.dtype)
+        
+        # Generate transcriptions for the whole batch at once; greedy decoding with a
+        # bounded length instead of running up to Whisper's 448-token default
+        with torch.inference_mode():
+            predicted_ids = self.stt_model.generate(
+                input_features,
+                num_beams=1,
+                max_new_tokens=128,
+                use_cache=True
+            )
+        decoded = self.stt_processor.batch_decode(
             predicted_ids, 
             skip_special_tokens=True
-        )[0]
+        )
+        for i, text in zip(non_empty, decoded):
+            transcriptions[i] = text
+        return transcriptions
+    
+    def _transcribe_faster_whisper(self, sources):
+        """
+        Transcribe audio with faster-whisper (CTranslate2), one file at a time.
+        Decoding, resampling and log-mel extraction happen inside CTranslate2.
         
-        return transcription
+        Args:
+            sources: Audio file paths or raw bytes
+            
+        Returns:
+            List of transcribed texts
+        """
+        texts = []
+        for source in sources:
+            if isinstance(source, (bytes, bytearray)):
+                source = io.BytesIO(source)
+            segments, _ = self.fw_model.transcribe(source, language="en", beam_size=1, vad_filter=True)
+            texts.append("".join(segment.text for segment in segments).strip())
+        return texts
     
-    def process_image_and_query(self, image_path, query):
+    def _load_audio(self, audio_path):
         """
-        Process an image and a query using Gemini model.
+        Load an audio file as a 16 kHz array for Whisper.
         
         Args:
-            image_path: Path to the image file
-            query: Text query about the image
+            audio_path: Path to the audio file, or its raw bytes
             
         Returns:
-            Response text from Gemini
+            Audio samples at 16000 Hz
         """
-        # Open and prepare the image
-        image = Image.open(image_path)
+        if isinstance(audio_path, (bytes, bytearray)):
+            audio_path = io.BytesIO(audio_path)
+        audio_array, sampling_rate = sf.read(audio_path, dtype="float32")
         
-        # Create detailed instruction prompt
-        prompt = f"""
-        You are an AI assistant specialized in analyzing images and providing detailed, accurate answers about them.
+        # Resample audio to 16000 Hz if necessary (polyphase FIR, no FFT)
+        if sampling_rate != 16000:
+            from scipy.signal import resample_poly
+
+            g = gcd(sampling_rate, 16000)
+            audio_array = resample_poly(audio_array, 16000 // g, sampling_rate // g, axis=0)
+        # Whisper's feature extractor works in float32; cast once here
+        return audio_array.astype(np.float32, copy=False)
+    
+    def preprocess_image(self, image_path):
+        """
+        Read an uploaded image as an inline blob ready to send to Gemini.
+        Formats Gemini accepts are forwarded as-is, so the image is never decoded locally.
         
-        Please analyze the image and answer this question: {query}
+        Args:
+            image_path: Path to the image file, which must be inside the upload folder
+            
+        Returns:
+            Dict with the image's mime_type and raw data
+            
+        Raises:
+            ValueError: If the path is outside the upload folder or the file is not an image
+        """
+        # image_path can come straight from a client form field, so never read outside the uploads
+        upload_root = os.path.realpath(self.upload_folder)
+        real_path = os.path.realpath(image_path)
+        if os.path.commonpath([upload_root, real_path]) != upload_root:
+            raise ValueError("Image path must be inside the upload folder")
         
-        Guidelines:
-        - Be detailed and descriptive in your explanation
-        - If the answer is not apparent from the image, acknowledge the limitation
-        - If there are ambiguities, mention them
-        - Use a conversational, helpful tone
-        - Focus on providing factual information
-        - If the question asks for calculations or text extraction, perform them accurately
-        - IMPORTANT: Format your response as plain text without markdown formatting
-        - For emphasis, use natural language indicators like "importantly" or "note that" instead of bold or italics
-        - For mathematical expressions, write them in a way that can be easily read aloud (e.g., "x squared plus 2x equals 10")
-        - Avoid using special characters like asterisks, underscores, dollar signs, or backticks for formatting
+        with open(real_path, "rb") as f:
+            data = f.read()
+        image_format = sniff(io.BytesIO(data))
+        if image_format not in IMAGE_MIME_TYPES:
+            raise ValueError("Unsupported image format")
+        if image_format not in _GEMINI_IMAGE_FORMATS:
+            from PIL import Image
+            
+            buffer = io.BytesIO()
+            with Image.open(io.BytesIO(data)) as img:
+                img.save(buffer, format="PNG")
+            return {"mime_type": "image/png", "data": buffer.getvalue()}
+        return {"mime_type": IMAGE_MIME_TYPES[image_format], "data": data}
+    
+    def process_image_and_query(self, image_path, query, digest=None):
+        """
+        Process an image and a query using Gemini model.
+        
+        Args:
+            image_path: Path to the image file, or a blob from preprocess_image
+            query: Text query about the image
+            digest: Optional content digest of the image; responses are memoized
+                per (digest, query), hashing the image bytes when it is not given
+            
+        Returns:
+            Response text from Gemini
         """
+        if digest:
+            cached = self._image_analyses.get((digest, query))
+            if cached is not None:
+                return cached
+
+        # Read the image (unless the caller already did)
+        image = image_path if isinstance(image_path, dict) else self.preprocess_image(image_path)
+        
+        if not digest:
+            # Callers without an upload digest (e.g. /api/generate_response) still get
+            # repeat (image, query) pairs served from memory; hashing is far cheaper than Gemini
+            digest = hashlib.blake2b(image["data"], digest_size=16).digest()
+            cached = self._image_analyses.get((digest, query))
+            if cached is not None:
+                return cached
         
         # Prepare content for Gemini (image + text)
         response = self.gemini_model.generate_content([
             image,
-            prompt
+            self._IMAGE_PROMPT_TEMPLATE.format(query=query)
         ])
         
+        self._image_analyses.put((digest, query), response.text)
         return response.text
     
-    def text_to_speech(self, text, voice='af_heart', speed=1.2):
+    def _prepare_tts(self, text, voice):
         """
-        Convert text to speech using Kokoro TTS with performance optimizations.
+        Clean text for speech and resolve the Kokoro voice to use.
+        
         Args:
             text: Text to convert to speech
-            voice: Voice name (see Kokoro docs for options)
-            speed: Speech speed (default 1.2 - slightly faster than original)
+            voice: Requested voice name
+            
         Returns:
-            Path to the generated audio file
+            Tuple of (cleaned text, voice name or local voice file path)
         """
         # Skip text cleaning for simple responses without special formatting
-        has_special_formatting = any(marker in text for marker in ['$', '**', '*', '__', '_', '#', '```', '`', '[', '!['])
+        has_special_formatting = not _SPECIAL_CHARS.isdisjoint(text)
         if has_special_formatting:
             cleaned_text = clean_text_for_tts(text)
         else:
             cleaned_text = text
         
-        # Validate that the voice exists
-        voices_dir = os.path.join("app", "backend", "kokoro_assets", "voices", "voices")
-        local_voice_path = os.path.join(voices_dir, f"{voice}.pt")
-        use_voice = voice
+        use_voice = self._voice_cache.get(voice)
+        if use_voice is None:
+            use_voice = self._resolve_voice(voice)
+            # Only cache downloaded files of known voices: keys stay bounded by AVAILABLE_VOICES,
+            # and by-name fallbacks are re-checked once the asset download has fetched the file
+            if voice in AVAILABLE_VOICES and use_voice != voice:
+                self._voice_cache[voice] = use_voice
+        return cleaned_text, use_voice
+    
+    def _resolve_voice(self, voice):
+        """
+        Map a requested voice to a local voice file, or a Kokoro voice name.
+        
+        Args:
+            voice: Requested voice name
+            
+        Returns:
+            Local voice file path if present, otherwise a valid voice name
+        """
+        # Prefer a downloaded voice file; otherwise let Kokoro fetch the voice by name
+        local_voice_path = os.path.join(self.voices_dir, f"{voice}.pt")
         if os.path.exists(local_voice_path):
-            print(f"[TTS] Using local voice file: {local_voice_path}")
-            use_voice = local_voice_path
-        else:
-            if voice not in AVAILABLE_VOICES:
-                print(f"Warning: Voice '{voice}' not found in AVAILABLE_VOICES. Falling back to 'af_heart'.")
-                use_voice = 'af_heart'
-            else:
-                print(f"[TTS] Local voice file not found for '{voice}'. Will attempt to download or use default Kokoro behavior.")
+            return local_voice_path
+        if voice not in AVAILABLE_VOICES:
+            print(f"Warning: Voice '{voice}' not found in AVAILABLE_VOICES. Falling back to 'af_heart'.")
+            return 'af_heart'
+        return voice
+    
+    def stream_speech(self, text, voice='af_heart', speed=1.2):
+        """
+        Synthesize speech incrementally, yielding audio as Kokoro produces it.
         
-        # For shorter texts, process as a single chunk - increased threshold to improve reliability
-        if len(cleaned_text) < 150:
-            try:
-                generator = self.kokoro_pipeline(cleaned_text, voice=use_voice, speed=speed)
-                audio_chunks = []
-                for _, _, audio in generator:
-                    audio_chunks.append(audio)
-                if len(audio_chunks) == 0:
-                    raise RuntimeError("No audio generated by Kokoro TTS.")
-                full_audio = np.concatenate(audio_chunks)
-            except Exception as e:
-                print(f"Error in single-chunk TTS processing: {str(e)}")
-                # Fallback to non-parallel processing for troublesome text
-                return self._fallback_tts(cleaned_text, use_voice, speed)
-        else:
-            try:
-                # Create proper chunks that won't cause the RuntimeError in espeak
-                # This avoids the words_mismatch.py error by using complete sentences
-                sentences = []
-                current = ""
-                # Split by punctuation with proper regex to maintain punctuation in output
-                for part in re.split(r'([.!?]+)', cleaned_text):
-                    current += part
-                    if re.search(r'[.!?]+$', part):
-                        sentences.append(current.strip())
-                        current = ""
-                
-                if current:  # Add any remaining text
-                    sentences.append(current.strip())
-                
-                # Group sentences into chunks of reasonable size
-                text_chunks = []
-                current_chunk = ""
-                
-                for sentence in sentences:
-                    # If adding this sentence would make the chunk too long, start a new chunk
-                    if len(current_chunk) + len(sentence) > 150:  # 150 chars per chunk - smaller for reliability
-                        if current_chunk:
-                            text_chunks.append(current_chunk)
-                        current_chunk = sentence
-                    else:
-                        if current_chunk:
-                            current_chunk += " " + sentence
-                        else:
-                            current_chunk = sentence
-                
-                # Add the last chunk if it exists
-                if current_chunk:
-                    text_chunks.append(current_chunk)
-                
-                # If we have problematic small chunks, process sequentially
-                if any(len(chunk) < 5 for chunk in text_chunks) or len(text_chunks) == 1:
-                    return self._fallback_tts(cleaned_text, use_voice, speed)
-                
-                # Process chunks in parallel with error handling
-                all_audio_chunks = []
-                
-                def process_chunk(chunk):
-                    try:
-                        chunk_audio_parts = []
-                        generator = self.kokoro_pipeline(chunk, voice=use_voice, speed=speed)
-                        for _, _, audio in generator:
-                            chunk_audio_parts.append(audio)
-                        if chunk_audio_parts:
-                            return np.concatenate(chunk_audio_parts)
-                        return np.array([])  # Empty array if no audio generated
-                    except Exception as e:
-                        print(f"Error processing TTS chunk: {str(e)}")
-                        return np.array([])  # Return empty on error
-                
-                # Use ThreadPoolExecutor for parallel processing with fewer workers
-                with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-                    # Submit all chunks for processing
-                    future_to_chunk = {executor.submit(process_chunk, chunk): chunk for chunk in text_chunks}
-                    
-                    # Collect results as they complete and handle errors
-                    for future in concurrent.futures.as_completed(future_to_chunk):
-                        try:
-                            chunk_audio = future.result()
-                            if len(chunk_audio) > 0:
-                                all_audio_chunks.append(chunk_audio)
-                        except Exception as e:
-                            chunk = future_to_chunk[future]
-                            print(f"Error retrieving chunk result for '{chunk}': {str(e)}")
-                
-                # If parallel processing failed, fall back to sequential
-                if not all_audio_chunks:
-                    print("Parallel processing failed, falling back to sequential processing")
-                    return self._fallback_tts(cleaned_text, use_voice, speed)
-                    
-                # Concatenate all processed chunks
-                full_audio = np.concatenate(all_audio_chunks)
+        Args:
+            text: Text to convert to speech
+            voice: Voice name (see Kokoro docs for options)
+            speed: Speech speed
             
-            except Exception as e:
-                print(f"Error in parallel TTS processing: {str(e)}")
-                # Fallback to sequential processing
-                return self._fallback_tts(cleaned_text, use_voice, speed)
+        Yields:
+            Float32 audio chunks at OUTPUT_SAMPLE_RATE
+        """
+        cleaned_text, use_voice = self._prepare_tts(text, voice)
+        # Kokoro splits long input on its own phoneme budget and yields per segment
+        for _, _, audio in self.kokoro_pipeline(cleaned_text, voice=use_voice, speed=speed):
+            yield np.asarray(audio, dtype=np.float32)
+    
+    def text_to_speech(self, text, voice='af_heart', speed=1.2):
+        """
+        Convert text to speech using Kokoro TTS, streaming audio to disk.
+        Args:
+            text: Text to convert to speech
+            voice: Voice name (see Kokoro docs for options)
+            speed: Speech speed (default 1.2 - slightly faster than original)
+        Returns:
+            Path to the generated audio file
+        """
+        cleaned_text, use_voice = self._prepare_tts(text, voice)
         
-        # Use a lower sample rate for faster processing (was 24000)
-        output_sample_rate = 22050  # Still good quality but slightly faster
+        output_filename, output_path = self._new_output_path("_response.wav")
+        
+        try:
+            # Kokoro splits the text by its own phoneme budget and yields segments
+            # with consistent prosody; write each one as soon as it is generated
+            written = 0
+            with self._open_output_wav(output_path) as wav:
+                for _, _, audio in self.kokoro_pipeline(cleaned_text, voice=use_voice, speed=speed):
+                    wav.write(np.asarray(audio, dtype=np.float32))
+                    written += 1
+            if written == 0:
+                raise RuntimeError("No audio generated by Kokoro TTS.")
+        except Exception as e:
+            print(f"Error in TTS processing: {str(e)}")
+            self._discard_output(output_path)
+            # Retry in one buffered pass (then sentence by sentence if needed)
+            return self._fallback_tts(cleaned_text, use_voice, speed)
         
-        output_filename = f"{uuid.uuid4()}_response.wav"
-        output_path = os.path.join(self.upload_folder, output_filename)
-        sf.write(output_path, full_audio, output_sample_rate)
         return output_filename
     
+    def _new_output_path(self, suffix):
+        """
+        Pick a unique name for a generated audio file.
+        
+        Args:
+            suffix: Filename suffix, e.g. "_response.wav"
+            
+        Returns:
+            Tuple of (filename relative to the upload folder, full path)
+        """
+        output_filename = uuid.uuid4().hex + suffix
+        return output_filename, self._upload_dir + output_filename
+    
+    def _open_output_wav(self, output_path):
+        """
+        Open a mono 16-bit WAV for incremental writing.
+        
+        Args:
+            output_path: Destination path
+            
+        Returns:
+            Writable soundfile.SoundFile (use as a context manager)
+        """
+        return sf.SoundFile(output_path, "w", samplerate=OUTPUT_SAMPLE_RATE, channels=1, subtype="PCM_16")
+    
+    def _discard_output(self, output_path):
+        """Remove a partially written output file before falling back."""
+        try:
+            os.remove(output_path)
+        except OSError:
+            pass
+    
     def _fallback_tts(self, text, voice, speed):
         """
-        Fallback method for text-to-speech that processes the entire text sequentially.
-        Used when parallel processing fails.
+        Fallback method for text-to-speech that buffers the whole text, then retries
+        sentence by sentence. Used when streaming synthesis in text_to_speech fails
+        or yields no audio, after its partial output file has been discarded.
         
         Args:
             text: Text to convert to speech
@@ -365,12 +743,11 @@ class ModelManager:
                         print(f"Error processing sentence '{sentence}': {str(e)}")
                         # Continue with next sentence if one fails
             
-            # If we have any audio, concatenate and return
+            # If we have any audio, join and return
             if audio_chunks:
-                full_audio = np.concatenate(audio_chunks)
-                output_sample_rate = 22050
-                output_filename = f"{uuid.uuid4()}_response.wav"
-                output_path = os.path.join(self.upload_folder, output_filename)
+                full_audio = join_audio(audio_chunks)
+                output_sample_rate = OUTPUT_SAMPLE_RATE
+                output_filename, output_path = self._new_output_path("_response.wav")
                 sf.write(output_path, full_audio, output_sample_rate)
                 return output_filename
                 
@@ -381,19 +758,17 @@ class ModelManager:
             for _, _, audio in gen:
                 error_chunks.append(audio)
                 
-            error_audio = np.concatenate(error_chunks)
-            output_filename = f"{uuid.uuid4()}_error_response.wav"
-            output_path = os.path.join(self.upload_folder, output_filename)
-            sf.write(output_path, error_audio, 22050)
+            error_audio = join_audio(error_chunks)
+            output_filename, output_path = self._new_output_path("_error_response.wav")
+            sf.write(output_path, error_audio, OUTPUT_SAMPLE_RATE)
             return output_filename
             
         except Exception as e:
             print(f"Fallback TTS also failed: {str(e)}")
             # Create a simple silent audio file as last resort
-            silent_audio = np.zeros(22050)  # 1 second of silence
-            output_filename = f"{uuid.uuid4()}_silent_response.wav"
-            output_path = os.path.join(self.upload_folder, output_filename)
-            sf.write(output_path, silent_audio, 22050)
+            silent_audio = np.zeros(OUTPUT_SAMPLE_RATE, dtype=np.float32)  # 1 second of silence
+            output_filename, output_path = self._new_output_path("_silent_response.wav")
+            sf.write(output_path, silent_audio, OUTPUT_SAMPLE_RATE)
             return output_filename
         
     def get_available_voices(self):
@@ -412,4 +787,19 @@ class ModelManager:
         Returns:
             Dictionary of voices grouped by language
         """
-        return VOICES_BY_LANGUAGE 
\ No newline at end of file
+        return VOICES_BY_LANGUAGE
+
+
+@functools.lru_cache(maxsize=None)
+def get_model_manager(upload_folder=None):
+    """
+    Return the process-wide ModelManager for an upload folder.
+    Models are loaded once and shared by every caller (Flask endpoints, pipeline).
+    
+    Args:
+        upload_folder: Folder where generated audio is written
+        
+    Returns:
+        Shared ModelManager instance
+    """
+    return ModelManager(upload_folder=upload_folder)
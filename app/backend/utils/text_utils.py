@@ -1,79 +1,102 @@
 import re
 
+# LaTeX tokens and their spoken equivalents inside math expressions
+_LATEX_SUB = {
+    '\\times': ' times ',
+    '\\div': ' divided by ',
+    '\\cdot': ' dot ',
+    '\\frac': ' fraction ',
+    '{': ' ',
+    '}': ' ',
+    '\\sqrt': ' square root of ',
+    '^': ' to the power of ',
+    '_': ' sub ',
+    '\\pi': ' pi ',
+    '\\infty': ' infinity ',
+    '\\sum': ' sum ',
+    '\\int': ' integral ',
+}
+# Longest tokens first so e.g. \infty wins over \int in the single-pass alternation
+_LATEX_SUB_RE = re.compile('|'.join(map(re.escape, sorted(_LATEX_SUB, key=len, reverse=True))))
+_LATEX_COMMAND_RE = re.compile(r'\\[a-zA-Z]+')
+
+_BLOCK_MATH_RE = re.compile(r'\$\$(.*?)\$\$', re.DOTALL)
+_INLINE_MATH_RE = re.compile(r'\$(.*?)\$')
+_HEADER_RE = re.compile(r'^#{1,6}\s+(.*?)$', re.MULTILINE)
+_BOLD_STAR_RE = re.compile(r'\*\*(.*?)\*\*')
+_ITALIC_STAR_RE = re.compile(r'\*(.*?)\*')
+_BOLD_UNDERSCORE_RE = re.compile(r'__(.*?)__')
+_ITALIC_UNDERSCORE_RE = re.compile(r'_(.*?)_')
+_UNORDERED_LIST_RE = re.compile(r'^\s*[\*\-\+]\s+(.*?)$', re.MULTILINE)
+_ORDERED_LIST_RE = re.compile(r'^\s*\d+\.\s+(.*?)$', re.MULTILINE)
+_CODE_BLOCK_RE = re.compile(r'```(?:.*?)\n(.*?)```', re.DOTALL)
+_INLINE_CODE_RE = re.compile(r'`(.*?)`')
+_LINK_RE = re.compile(r'\[(.*?)\]\(.*?\)')
+_IMAGE_RE = re.compile(r'!\[(.*?)\]\(.*?\)')
+_HORIZONTAL_RULE_RE = re.compile(r'^-{3,}$', re.MULTILINE)
+_EXTRA_NEWLINES_RE = re.compile(r'\n{3,}')
+_QUOTE_RE = re.compile(r'^\s*>\s+(.*?)$', re.MULTILINE)
+
+# Leftover markdown characters, stripped in one pass
+_ARTIFACTS_TABLE = str.maketrans('', '', '\\*_#`')
+
+def _replace_latex_token(match):
+    return _LATEX_SUB[match.group(0)]
+
+def _replace_inline_math(match):
+    """Turn the LaTeX inside a $...$ or $$...$$ match into speakable text."""
+    expr = match.group(1).strip()
+    # Basic LaTeX cleaning - replace common math symbols with spoken equivalents
+    expr = _LATEX_SUB_RE.sub(_replace_latex_token, expr)
+    expr = _LATEX_COMMAND_RE.sub(' ', expr)  # Remove other LaTeX commands
+    return f" {expr} "
+
 def clean_text_for_tts(text):
     """
     Clean markdown and LaTeX formatting from text to make it suitable for TTS.
-    
+
     Args:
         text: Text with markdown/LaTeX formatting
-        
+
     Returns:
         Clean text suitable for TTS
     """
     # Handle math expressions in LaTeX format
-    # Replace inline math $...$ with "the expression ..."
-    def replace_inline_math(match):
-        expr = match.group(1).strip()
-        # Basic LaTeX cleaning - replace common math symbols with spoken equivalents
-        expr = expr.replace('\\times', ' times ')
-        expr = expr.replace('\\div', ' divided by ')
-        expr = expr.replace('\\cdot', ' dot ')
-        expr = expr.replace('\\frac', ' fraction ')
-        expr = expr.replace('{', ' ').replace('}', ' ')
-        expr = expr.replace('\\sqrt', ' square root of ')
-        expr = expr.replace('^', ' to the power of ')
-        expr = expr.replace('_', ' sub ')
-        expr = expr.replace('\\pi', ' pi ')
-        expr = expr.replace('\\infty', ' infinity ')
-        expr = expr.replace('\\sum', ' sum ')
-        expr = expr.replace('\\int', ' integral ')
-        expr = re.sub(r'\\[a-zA-Z]+', ' ', expr)  # Remove other LaTeX commands
-        return f" {expr} "
-    
-    # Replace block math $$...$$ with "the expression ..."
-    text = re.sub(r'\$\$(.*?)\$\$', replace_inline_math, text, flags=re.DOTALL)
-    text = re.sub(r'\$(.*?)\$', replace_inline_math, text)
-    
+    # Replace block math $$...$$ and inline math $...$ with the spoken expression
+    text = _BLOCK_MATH_RE.sub(_replace_inline_math, text)
+    text = _INLINE_MATH_RE.sub(_replace_inline_math, text)
+
     # Replace markdown headers with plain text and emphasis
-    text = re.sub(r'^#{1,6}\s+(.*?)$', r'\1.', text, flags=re.MULTILINE)
-    
+    text = _HEADER_RE.sub(r'\1.', text)
+
     # Replace markdown bold/italic with plain text
-    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)  # Bold
-    text = re.sub(r'\*(.*?)\*', r'\1', text)      # Italic
-    text = re.sub(r'__(.*?)__', r'\1', text)      # Bold
-    text = re.sub(r'_(.*?)_', r'\1', text)        # Italic
-    
+    text = _BOLD_STAR_RE.sub(r'\1', text)          # Bold
+    text = _ITALIC_STAR_RE.sub(r'\1', text)        # Italic
+    text = _BOLD_UNDERSCORE_RE.sub(r'\1', text)    # Bold
+    text = _ITALIC_UNDERSCORE_RE.sub(r'\1', text)  # Italic
+
     # Replace markdown lists with plain text
-    text = re.sub(r'^\s*[\*\-\+]\s+(.*?)$', r'• \1', text, flags=re.MULTILINE)  # Unordered lists
-    text = re.sub(r'^\s*\d+\.\s+(.*?)$', r'\1', text, flags=re.MULTILINE)      # Ordered lists
-    
+    text = _UNORDERED_LIST_RE.sub(r'• \1', text)  # Unordered lists
+    text = _ORDERED_LIST_RE.sub(r'\1', text)      # Ordered lists
+
     # Replace markdown code blocks with plain text
-    text = re.sub(r'```(?:.*?)\n(.*?)```', r'\1', text, flags=re.DOTALL)  # Code blocks
-    text = re.sub(r'`(.*?)`', r'\1', text)  # Inline code
-    
+    text = _CODE_BLOCK_RE.sub(r'\1', text)   # Code blocks
+    text = _INLINE_CODE_RE.sub(r'\1', text)  # Inline code
+
     # Replace markdown links with just the text
-    text = re.sub(r'\[(.*?)\]\(.*?\)', r'\1', text)
-    
+    text = _LINK_RE.sub(r'\1', text)
+
     # Replace markdown images with alt text or placeholder
-    text = re.sub(r'!\[(.*?)\]\(.*?\)', r'Image: \1', text)
-    
+    text = _IMAGE_RE.sub(r'Image: \1', text)
+
     # Replace horizontal rules
-    text = re.sub(r'^-{3,}$', ' ', text, flags=re.MULTILINE)
-    
+    text = _HORIZONTAL_RULE_RE.sub(' ', text)
+
     # Replace multiple newlines with a single one
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    
+    text = _EXTRA_NEWLINES_RE.sub('\n\n', text)
+
     # Replace markdown quotes with plain text
-    text = re.sub(r'^\s*>\s+(.*?)$', r'\1', text, flags=re.MULTILINE)
-    
-    # Fix any remaining markdown artifacts
-    text = text.replace('\\', '')
-    text = text.replace('**', '')
-    text = text.replace('*', '')
-    text = text.replace('__', '')
-    text = text.replace('_', '')
-    text = text.replace('#', '')
-    text = text.replace('```', '')
-    text = text.replace('`', '')
-    
-    return text 
\ No newline at end of file
+    text = _QUOTE_RE.sub(r'\1', text)
+
+    # Fix any remaining markdown artifacts (backslashes, *, _, #, `)
+    return text.translate(_ARTIFACTS_TABLE)
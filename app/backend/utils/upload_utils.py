@@ -0,0 +1,163 @@
+import os
+import uuid
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+# Copy uploads in 1 MiB blocks so memory use stays flat regardless of file size
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Leading bytes of the upload formats we accept, checked before any model sees the file
+MAGIC_BYTES = (
+    (b"RIFF", "wav"),
+    (b"OggS", "ogg"),
+    (b"ID3", "mp3"),
+    (b"fLaC", "flac"),
+    (b"\xff\xfb", "mp3"),
+    (b"\x89PNG", "png"),
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"BM", "bmp"),
+)
+AUDIO_FORMATS = frozenset({"wav", "ogg", "mp3", "flac"})
+# MIME type per sniffed image format, so a file's label never comes from its name
+IMAGE_MIME_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+    "gif": "image/gif",
+    "bmp": "image/bmp",
+}
+
+# Extensions kept on stored uploads; anything else is stored without one
+ALLOWED_EXTENSIONS = frozenset({
+    ".wav", ".ogg", ".mp3", ".flac",
+    ".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp",
+})
+
+# Background writer for uploads that are processed from memory but kept for replay
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="upload-writer")
+
+def sniff(stream):
+    """
+    Identify an upload from its first bytes without consuming the stream.
+    
+    Args:
+        stream: Seekable binary stream positioned at the start of the file
+        
+    Returns:
+        Format name from MAGIC_BYTES, or None if unrecognized
+    """
+    head = stream.read(12)
+    stream.seek(0)
+    # WebP shares the RIFF container with WAV; its form type follows the chunk size
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return "webp"
+    for magic, kind in MAGIC_BYTES:
+        if head.startswith(magic):
+            return kind
+    return None
+
+def upload_ext(filename):
+    """
+    Return the lowercase extension of a client filename if it is allowlisted.
+    Stored names are built from a digest or uuid4 hex plus this extension,
+    so they are safe by construction without sanitizing the client name.
+    
+    Args:
+        filename: Original client filename
+        
+    Returns:
+        Extension including the dot, or an empty string
+    """
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if ext in ALLOWED_EXTENSIONS else ""
+
+def save_upload(upload, path, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Stream an uploaded file to disk, hashing it in the same pass.
+    
+    Args:
+        upload: Werkzeug FileStorage from request.files
+        path: Destination path on disk
+        chunk_size: Number of bytes copied per read
+        
+    Returns:
+        Hex SHA-256 digest of the uploaded content
+    """
+    digest = hashlib.sha256()
+    stream = upload.stream
+    with open(path, "wb") as f:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest()
+
+def store_upload(upload, folder, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Save an upload under a content-addressed name (<sha256><ext>).
+    Identical files map to the same path, so their model results can be reused.
+    
+    Args:
+        upload: Werkzeug FileStorage from request.files
+        folder: Upload folder to store the file in
+        chunk_size: Number of bytes copied per read
+        
+    Returns:
+        Tuple of (path on disk, hex SHA-256 digest)
+    """
+    ext = upload_ext(upload.filename)
+    # The digest is only known after the copy, so stream to a unique temp name first
+    tmp_path = os.path.join(folder, f"{uuid.uuid4().hex}.part")
+    digest = save_upload(upload, tmp_path, chunk_size)
+    path = os.path.join(folder, digest + ext)
+    if os.path.exists(path):
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, path)
+    return path, digest
+
+def read_upload(upload):
+    """
+    Read an upload fully into memory.
+    
+    Args:
+        upload: Werkzeug FileStorage from request.files
+        
+    Returns:
+        Tuple of (raw bytes, hex SHA-256 digest)
+    """
+    raw = upload.stream.read()
+    return raw, hashlib.sha256(raw).hexdigest()
+
+def persist_upload_async(raw, folder, digest, filename):
+    """
+    Schedule an in-memory upload to be written under its content-addressed name.
+    
+    Args:
+        raw: Uploaded file contents
+        folder: Upload folder to store the file in
+        digest: Hex SHA-256 digest of raw
+        filename: Original client filename, used only for its extension
+        
+    Returns:
+        Path the file will be written to
+    """
+    ext = upload_ext(filename)
+    path = os.path.join(folder, digest + ext)
+    if not os.path.exists(path):
+        _writer.submit(_write_file, raw, path)
+    return path
+
+def _write_file(raw, path):
+    """Write bytes atomically so readers never see a partial file."""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(raw)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: Could not persist upload {path}: {str(e)}")
@@ -1,6 +1,10 @@
 import os
+import json
+import mimetypes
+import contextlib
 import gradio as gr
 import requests
+from requests_toolbelt import MultipartEncoder
 from dotenv import dotenv_values
 
 def launch_gradio():
@@ -12,6 +16,9 @@ def launch_gradio():
 
     config = dotenv_values('.env')
 
+    # Keep-alive connection pool shared by every analysis request
+    session = requests.Session()
+
     # --------------------------------------------------------------------------
     # 🔊 Fetch available voices from backend
     # --------------------------------------------------------------------------
@@ -46,18 +53,25 @@ def launch_gradio():
         if image is None and audio is None and not text:
             return "Please provide at least an image, audio, or text input.", "", None
 
-        files = {}
-        if image:
-            files["image"] = open(image, "rb")
-        if audio:
-            files["audio"] = open(audio, "rb")
-        data = {
-            "text": text,
-            "enable_tts": "true",
-        }
-
         try:
-            response = requests.post(ANALYZE_API_URL, files=files, data=data)
+            # Files are streamed from disk by the encoder and closed when the request ends
+            with contextlib.ExitStack() as stack:
+                fields = {
+                    "text": text or "",
+                    "enable_tts": "true",
+                }
+                for field, path in (("image", image), ("audio", audio)):
+                    if path:
+                        mime_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                        fields[field] = (os.path.basename(path), stack.enter_context(open(path, "rb")), mime_type)
+                encoder = MultipartEncoder(fields)
+                # Allow for Whisper + Gemini + TTS; matches the Gunicorn worker timeout
+                response = session.post(
+                    ANALYZE_API_URL,
+                    data=encoder,
+                    headers={"Content-Type": encoder.content_type},
+                    timeout=120
+                )
             if response.status_code == 200:
                 result = response.json()
 
@@ -131,19 +145,25 @@ def launch_gradio():
         # ----------------------------------------------------------------------
         # 🔄 Event Handlers
         # ----------------------------------------------------------------------
-        def update_voice_options(language):
-            """Update voice dropdown when language changes."""
-            if language in voices_options:
-                voices = voices_options[language]
-                default_voice = list(voices.keys())[0] if voices else None
-                return gr.update(choices=list(voices.keys()), value=default_voice)
-            else:
-                return gr.update(choices=[], value=None)
+        # The language → voices mapping is static, so it is embedded in the page and
+        # the voice dropdown is updated in the browser without a server round trip
+        voice_labels_by_language = json.dumps({lang: list(voices) for lang, voices in voices_options.items()})
+        update_voice_options_js = f"""
+        (language) => {{
+            const voices = {voice_labels_by_language}[language] || [];
+            return {{
+                __type__: "update",
+                choices: voices.map((label) => [label, label]),
+                value: voices.length ? voices[0] : null
+            }};
+        }}
+        """
 
         language_dropdown.change(
-            fn=update_voice_options,
+            fn=None,
             inputs=[language_dropdown],
-            outputs=[voice_dropdown]
+            outputs=[voice_dropdown],
+            js=update_voice_options_js
         )
 
         analyze_btn.click(
@@ -0,0 +1,22 @@
+# Gunicorn configuration for serving the Flask backend in production:
+#   gunicorn -c gunicorn.conf.py app.backend.services.flask_app:app
+# Put nginx in front with `proxy_request_buffering on;` so slow clients are
+# buffered by the proxy instead of tying up worker threads.
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "127.0.0.1:5000")
+
+# Every worker process loads its own copy of Whisper and Kokoro, so keep the
+# process count low and get concurrency for Gemini/TTS waits from threads.
+workers = int(os.environ.get("GUNICORN_WORKERS", 2))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+
+# /analyze can chain Whisper, two Gemini calls and Kokoro
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth
+max_requests = 1000
+max_requests_jitter = 100
@@ -1,37 +1,110 @@
 import os
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # Only show TensorFlow warnings and errors
+import shutil
+import itertools
+import subprocess
 import threading
 import atexit
-from app.backend.services.flask_app import app as flask_app
-from app.frontend.gradio_app import launch_gradio
+from concurrent.futures import ThreadPoolExecutor
+from waitress import create_server
 
 UPLOADS_DIR = os.path.join("app", "uploads")
 
-def cleanup_uploads_folder():
-    """Clean the uploads folder by deleting all files within it."""
-    if os.path.exists(UPLOADS_DIR):
-        for filename in os.listdir(UPLOADS_DIR):
-            file_path = os.path.join(UPLOADS_DIR, filename)
-            if os.path.isfile(file_path):
-                try:
-                    os.remove(file_path)
-                except Exception as e:
-                    print(f"Warning: Could not delete {file_path}: {e}")
+# Concurrent unlinks overlap syscall latency on network or Windows mounts
+CLEANUP_WORKERS = 32
+
+# Above this many entries, deleting through find/del beats per-entry Python calls
+BULK_DELETE_THRESHOLD = 1000
+
+def _remove_upload_entry(entry):
+    """Delete one entry of the uploads folder, recursing into subfolders such as tts_cache."""
+    try:
+        # DirEntry.is_dir uses the type cached by scandir, so files cost a single unlink
+        if entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path, ignore_errors=True)
+        else:
+            os.unlink(entry.path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Warning: Could not delete {entry.path}: {e}")
 
-# Clean up uploads on startup
-cleanup_uploads_folder()
+def _native_bulk_delete():
+    """
+    Empty the uploads folder with the platform's own bulk delete tool.
 
-atexit.register(cleanup_uploads_folder)
+    Returns:
+        True if the tool ran and reported success
+    """
+    if os.name == "nt":
+        # del leaves subfolders behind; the caller sweeps up what remains
+        command = ["cmd", "/c", "del", "/Q", "/S", os.path.join(UPLOADS_DIR, "*")]
+    else:
+        command = ["find", UPLOADS_DIR, "-mindepth", "1", "-delete"]
+    try:
+        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    except OSError as e:
+        print(f"Warning: Bulk delete of {UPLOADS_DIR} failed, falling back to per-file deletes: {e}")
+        return False
+    return result.returncode == 0
+
+def _scan_uploads(limit=None):
+    """List the uploads folder, reading at most limit + 1 entries when a limit is given."""
+    try:
+        with os.scandir(UPLOADS_DIR) as it:
+            # Stop after the first directory read when there is nothing to delete
+            first = next(it, None)
+            if first is None:
+                return []
+            rest = it if limit is None else itertools.islice(it, limit)
+            return [first, *rest]
+    except FileNotFoundError:
+        return []
+
+def cleanup_uploads_folder():
+    """Clean the uploads folder by deleting everything within it in parallel."""
+    entries = _scan_uploads(limit=BULK_DELETE_THRESHOLD)
+    if len(entries) > BULK_DELETE_THRESHOLD:
+        _native_bulk_delete()
+        # Whatever the native tool left behind (folders on Windows, or everything
+        # if it failed) goes through the parallel path below
+        entries = _scan_uploads()
+    if not entries:
+        return
+    with ThreadPoolExecutor(max_workers=min(CLEANUP_WORKERS, len(entries))) as executor:
+        list(executor.map(_remove_upload_entry, entries))
+
+# Handle to the running Waitress server, so it can be shut down deterministically
+flask_server = None
 
 def run_flask():
-    """Run the Flask backend server."""
-    flask_app.run(debug=False, port=5000, use_reloader=False)
+    """Run the Flask backend on a multi-threaded Waitress server."""
+    global flask_server
+    # Imported here so the backend's heavy imports overlap with Gradio's in the main thread
+    from app.backend.services.flask_app import app as flask_app
+    # Each in-flight request (transcription, Gemini, TTS) gets its own worker thread
+    # instead of queuing behind the single-threaded Werkzeug dev server
+    flask_server = create_server(flask_app, host="127.0.0.1", port=5000, threads=max(4, os.cpu_count() or 1))
+    flask_server.run()
+
+def shutdown_flask():
+    """Close the Flask backend's listening socket and worker threads, if it is running."""
+    global flask_server
+    server, flask_server = flask_server, None
+    if server is not None:
+        server.close()
 
 def run_gradio():
     """Launch the Gradio frontend interface."""
+    from app.frontend.gradio_app import launch_gradio
     launch_gradio()
 
 if __name__ == "__main__":
+    # Clean up uploads on startup and exit; importing main (e.g. from tests) touches no files
+    cleanup_uploads_folder()
+    atexit.register(cleanup_uploads_folder)
+    atexit.register(shutdown_flask)
+
     # Create uploads directory if it doesn't exist
     os.makedirs(UPLOADS_DIR, exist_ok=True)
 
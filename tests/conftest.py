@@ -1,16 +1,88 @@
+import io
 import os
 import pytest
 import shutil
+import sys
+import types
+import importlib.util
+from unittest.mock import MagicMock
 from pathlib import Path
 import numpy as np
 
+def build_model_stubs():
+    """
+    Build stand-in modules for the model libraries ModelManager imports when loading.
+
+    Returns:
+        Mapping of module name to stub module, ready for sys.modules
+    """
+    transformers = types.ModuleType("transformers")
+    transformers.WhisperProcessor = MagicMock()
+    transformers.WhisperForConditionalGeneration = MagicMock()
+    
+    genai = types.ModuleType("google.generativeai")
+    genai.GenerativeModel = MagicMock()
+    genai.configure = MagicMock()
+    
+    kokoro = types.ModuleType("kokoro")
+    kokoro.KPipeline = MagicMock()
+    
+    stubs = {"transformers": transformers, "google.generativeai": genai, "kokoro": kokoro}
+    # `import google.generativeai` also needs its parent package
+    if importlib.util.find_spec("google") is None:
+        google = types.ModuleType("google")
+        google.__path__ = []
+        google.generativeai = genai
+        stubs["google"] = google
+    return stubs
+
+# Install the stubs before any test module is collected, so importing the app
+# never loads the real transformers / Gemini / Kokoro packages.
+# Set VV_FAST_TESTS=0 to keep the real libraries importable.
+MODEL_STUBS = build_model_stubs()
+if os.environ.get("VV_FAST_TESTS", "1") != "0":
+    for _name, _module in MODEL_STUBS.items():
+        sys.modules.setdefault(_name, _module)
+
+# Importing flask_app would otherwise start a background preload that downloads the
+# Kokoro assets and imports torch
+os.environ["MODEL_PRELOAD"] = "false"
+
+@pytest.fixture(scope="session")
+def model_stubs():
+    """Stub modules standing in for the model libraries, for tests that mock model loading."""
+    return MODEL_STUBS
+
 @pytest.fixture(scope="session")
 def test_dir():
-    """Create and return the test directory path."""
-    test_dir = Path("tests/test_data")
-    test_dir.mkdir(exist_ok=True)
+    """Create and return the test directory path, on a ramdisk when one is writable."""
+    ramdisk = Path(os.environ.get("PYTEST_RAMDISK", "/dev/shm"))
+    if ramdisk.is_dir() and os.access(ramdisk, os.W_OK):
+        test_dir = ramdisk / "visionvoice_test_data"
+    else:
+        # Windows and some CI runners have no /dev/shm
+        test_dir = Path("tests/test_data")
+    # One subdirectory per pytest-xdist worker so parallel workers never share files
+    test_dir = test_dir / os.environ.get("PYTEST_XDIST_WORKER", "gw0")
+    test_dir.mkdir(parents=True, exist_ok=True)
     return test_dir
 
+@pytest.fixture(scope="module")
+def module_monkeypatch():
+    """Monkeypatch that stays in effect for a whole module, for module-scoped fixtures."""
+    mp = pytest.MonkeyPatch()
+    yield mp
+    mp.undo()
+
+@pytest.fixture(scope="session", autouse=True)
+def server_lifecycle():
+    """Shut down a backend server started through main, so no socket or thread outlives the session."""
+    yield
+    # Only relevant if a test imported main and started the server
+    main = sys.modules.get("main")
+    if main is not None:
+        main.shutdown_flask()
+
 @pytest.fixture(scope="session", autouse=True)
 def cleanup_test_files(test_dir):
     """Clean up test files after all tests have run."""
@@ -22,74 +94,61 @@ def cleanup_test_files(test_dir):
         elif item.is_dir():
             shutil.rmtree(item)
 
-@pytest.fixture
-def sample_image(test_dir):
-    """Create a simple test image."""
+@pytest.fixture(scope="session")
+def sample_image(tmp_path_factory):
+    """Create a simple test image, shared by every test in the session."""
     from PIL import Image
     
-    # Create a small test image
-    img_path = test_dir / "test_image.jpg"
+    # Create a small test image; pytest removes its temp directories itself
+    img_path = tmp_path_factory.mktemp("image", numbered=False) / "test_image.jpg"
     img = Image.new('RGB', (100, 100), color='red')
     img.save(img_path)
     
-    yield str(img_path)
-    
-    # Cleanup happens in cleanup_test_files
+    return str(img_path)
 
-@pytest.fixture
-def sample_audio(test_dir):
-    """Create a simple test audio file with proper WAV format."""
+@pytest.fixture(scope="session")
+def sample_audio_bytes():
+    """Build a simple WAV file in memory, for API tests that only upload its bytes."""
     import soundfile as sf
-    import wave
-    
-    # Create a simple sine wave audio file with standard WAV format
-    audio_path = test_dir / "test_audio.wav"
     
     # Create 1 second of audio at 16kHz
     samplerate = 16000
     duration = 1  # seconds
-    t = np.linspace(0, duration, int(samplerate * duration))
-    data = np.sin(2 * np.pi * 440 * t)  # 440 Hz tone
+    n = samplerate * duration
     
-    # Ensure the data is in float32 format
-    data = data.astype(np.float32)
+    # 440 Hz tone synthesized in float32 and written as int16 PCM without further casts
+    t = np.arange(n, dtype=np.float32) * np.float32(2 * np.pi * 440 / samplerate)
+    data = (np.sin(t, out=t) * 32767).astype(np.int16)
     
     # Write using soundfile which handles the format correctly
-    sf.write(str(audio_path), data, samplerate, format='WAV', subtype='PCM_16')
-    
-    # Verify the file exists and has content
-    assert os.path.exists(audio_path)
-    assert os.path.getsize(audio_path) > 0
-    
-    # Try opening it with wave to verify it's valid
-    with wave.open(str(audio_path), 'rb') as wf:
-        assert wf.getnchannels() == 1
-        assert wf.getsampwidth() == 2  # 16-bit
-        assert wf.getframerate() == samplerate
-    
-    yield str(audio_path)
-    
-    # Cleanup happens in cleanup_test_files
+    buffer = io.BytesIO()
+    sf.write(buffer, data, samplerate, format='WAV', subtype='PCM_16')
+    return buffer.getvalue()
+
+@pytest.fixture(scope="session")
+def sample_audio(tmp_path_factory, sample_audio_bytes):
+    """Write the sample WAV to disk, for tests that need a real audio file path."""
+    audio_path = tmp_path_factory.mktemp("audio", numbered=False) / "test_audio.wav"
+    audio_path.write_bytes(sample_audio_bytes)
+    return str(audio_path)
 
-@pytest.fixture
-def mock_kokoro_assets_dir(test_dir):
-    """Create and setup a mock Kokoro assets directory."""
-    kokoro_dir = test_dir / "mock_kokoro_assets"
+@pytest.fixture(scope="session")
+def mock_kokoro_assets_dir(tmp_path_factory):
+    """Create and setup a mock Kokoro assets directory, shared by every test in the session."""
+    kokoro_dir = tmp_path_factory.mktemp("mock_kokoro_assets", numbered=False)
     voices_dir = kokoro_dir / "voices" / "voices"
-    
-    # Create all necessary directories
-    kokoro_dir.mkdir(exist_ok=True)
     voices_dir.mkdir(parents=True, exist_ok=True)
     
     # Create empty placeholder files to simulate downloaded assets
-    (kokoro_dir / "kokoro-v1_0.pth").touch()
-    (kokoro_dir / "config.json").touch()
-    (voices_dir / "af_heart.pt").touch()
+    for placeholder in (kokoro_dir / "kokoro-v1_0.pth", kokoro_dir / "config.json", voices_dir / "af_heart.pt"):
+        if not placeholder.exists():
+            placeholder.touch()
     
-    # Set environment variable for tests
-    os.environ["KOKORO_ASSETS_DIR"] = str(kokoro_dir)
-    os.environ["KOKORO_PATH"] = str(kokoro_dir)
+    # Set environment variables for the session only; they are restored at teardown
+    mp = pytest.MonkeyPatch()
+    mp.setenv("KOKORO_ASSETS_DIR", str(kokoro_dir))
+    mp.setenv("KOKORO_PATH", str(kokoro_dir))
     
     yield str(kokoro_dir)
     
-    # Cleanup happens in cleanup_test_files 
\ No newline at end of file
+    mp.undo()
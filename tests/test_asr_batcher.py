@@ -0,0 +1,28 @@
+import threading
+import pytest
+from unittest.mock import MagicMock
+from app.backend.services.asr_batcher import AsrBatcher
+
+class TestAsrBatcher:
+    """Test suite for the Whisper micro-batcher."""
+
+    def test_transcribe_times_out_when_worker_is_stuck(self):
+        """Test that a stuck transcription turns into a TimeoutError instead of blocking forever."""
+        release = threading.Event()
+        manager = MagicMock()
+        manager.transcribe_batch.side_effect = lambda paths, digests: release.wait() and ["late"] * len(paths)
+        batcher = AsrBatcher(manager, max_wait_ms=0, timeout=0.05)
+        try:
+            with pytest.raises(TimeoutError):
+                batcher.transcribe(b"audio")
+        finally:
+            release.set()
+            batcher.close()
+
+    def test_requests_fail_once_worker_has_stopped(self):
+        """Test that no request waits on a worker that has exited."""
+        batcher = AsrBatcher(MagicMock(), max_wait_ms=0)
+        batcher.close()
+
+        with pytest.raises(RuntimeError, match="not running"):
+            batcher.transcribe(b"audio")
@@ -0,0 +1,40 @@
+import os
+import json
+from app.backend.utils.cache import TTSCache
+
+class TestTTSCache:
+    """Test suite for the on-disk TTS cache index."""
+
+    def _touch(self, folder, filename):
+        with open(os.path.join(folder, filename), "wb") as f:
+            f.write(b"RIFF")
+
+    def test_index_is_bounded(self, tmp_path):
+        """Test that the least recently used entries are evicted once the index is full."""
+        cache = TTSCache(str(tmp_path), max_entries=2)
+        for name in ("a", "b", "c"):
+            self._touch(tmp_path, f"{name}.wav")
+        cache.put("a", "a.wav")
+        cache.put("b", "b.wav")
+        assert cache.get("a") == "a.wav"  # "b" is now the least recently used
+
+        cache.put("c", "c.wav")
+
+        with open(cache.index_path, encoding="utf-8") as f:
+            assert json.load(f) == {"a": "a.wav", "c": "c.wav"}
+
+    def test_stale_entries_are_not_merged_back(self, tmp_path):
+        """Test that an entry whose audio file is gone stays gone after the next write."""
+        writer = TTSCache(str(tmp_path))
+        reader = TTSCache(str(tmp_path))
+        for name in ("a", "b"):
+            self._touch(tmp_path, f"{name}.wav")
+        writer.put("a", "a.wav")
+        assert reader.get("a") == "a.wav"
+
+        os.remove(tmp_path / "a.wav")
+        assert reader.get("a") is None
+        reader.put("b", "b.wav")
+
+        with open(reader.index_path, encoding="utf-8") as f:
+            assert json.load(f) == {"b": "b.wav"}
@@ -3,38 +3,58 @@ import pytest
 import json
 from unittest.mock import patch, MagicMock
 from io import BytesIO
+import numpy as np
 from app.backend.services.flask_app import app
-from app.backend.utils.model_manager import ModelManager
+from app.backend.utils.cache import TTSCache
+from app.backend.services.asr_batcher import AsrBatcher
 
 class TestFlaskAPI:
     """Test suite for the Flask API."""
     
-    @pytest.fixture
-    def client(self):
-        """Create a test client for the Flask app."""
+    @pytest.fixture(scope="module")
+    def client(self, module_monkeypatch, test_dir):
+        """Create a test client for the Flask app, shared by the whole module."""
         app.config['TESTING'] = True
-        app.config['UPLOAD_FOLDER'] = 'tests/test_data'
-        
-        # Ensure test upload folder exists
-        os.makedirs('tests/test_data', exist_ok=True)
+        app.config['UPLOAD_FOLDER'] = str(test_dir)
+        module_monkeypatch.setattr('app.backend.services.flask_app.UPLOAD_FOLDER', str(test_dir))
         
         with app.test_client() as client:
             yield client
     
-    @pytest.fixture
-    def mock_model_manager(self, monkeypatch):
-        """Create a mock ModelManager for testing."""
-        mock_manager = MagicMock(spec=ModelManager)
+    @pytest.fixture(scope="module")
+    def mock_model_manager(self, request):
+        """Create a mock ModelManager for testing, shared by the whole module."""
+        # No spec: the tests only check return values, and the module is patched once
+        patcher = patch('app.backend.services.flask_app.model_manager')
+        mock_manager = patcher.start()
+        request.addfinalizer(patcher.stop)
+        
         mock_manager.transcribe_audio.return_value = "What is in this image?"
+        mock_manager.transcribe_batch.side_effect = lambda paths, digests=None: ["What is in this image?"] * len(paths)
         mock_manager.process_image_and_query.return_value = "The image contains a cat."
         mock_manager.text_to_speech.return_value = "response_audio.wav"
         mock_manager.get_available_voices.return_value = {"af_heart": {"name": "Heart", "gender": "Female"}}
         mock_manager.get_voices_by_language.return_value = {"English (African)": ["af_heart"]}
         
-        # Monkeypatch the ModelManager in the flask_app module
-        monkeypatch.setattr('app.backend.services.flask_app.model_manager', mock_manager)
+        # Route batched transcription through the mock as well
+        batcher = AsrBatcher(mock_manager, max_wait_ms=0)
+        batcher_patcher = patch('app.backend.services.flask_app.asr_batcher', batcher)
+        batcher_patcher.start()
+        request.addfinalizer(batcher.close)
+        request.addfinalizer(batcher_patcher.stop)
         
-        yield mock_manager
+        return mock_manager
+    
+    @pytest.fixture(autouse=True)
+    def isolate_test_state(self, monkeypatch, tmp_path, mock_model_manager):
+        """Give each test an empty TTS cache and clear what it did to the shared mock."""
+        monkeypatch.setattr('app.backend.services.flask_app.tts_cache', TTSCache(str(tmp_path)))
+        
+        yield
+        
+        # Call records and per-test failures must not leak into the next test
+        mock_model_manager.reset_mock()
+        mock_model_manager.transcribe_audio.side_effect = None
     
     def test_health_check(self, client):
         """Test the health check endpoint."""
@@ -43,11 +63,35 @@ class TestFlaskAPI:
         assert response.status_code == 200
         assert response.json['status'] == 'ok'
     
-    def test_transcribe_audio(self, client, mock_model_manager):
+    def test_ready_check(self, client, mock_model_manager):
+        """Test that the readiness endpoint reflects model loading state."""
+        mock_model_manager.is_ready.return_value = False
+        mock_model_manager.load_error.return_value = None
+        response = client.get('/api/ready')
+        assert response.status_code == 503
+        assert response.json['status'] == 'loading'
+        
+        mock_model_manager.is_ready.return_value = True
+        response = client.get('/api/ready')
+        
+        assert response.status_code == 200
+        assert response.json['status'] == 'ready'
+    
+    def test_ready_check_reports_load_failure(self, client, mock_model_manager):
+        """Test that the readiness endpoint reports a failed preload instead of loading forever."""
+        mock_model_manager.is_ready.return_value = False
+        mock_model_manager.load_error.return_value = "Kokoro assets unavailable"
+        response = client.get('/api/ready')
+        
+        assert response.status_code == 503
+        assert response.json['status'] == 'error'
+        assert response.json['details'] == "Kokoro assets unavailable"
+    
+    def test_transcribe_audio(self, client, mock_model_manager, sample_audio_bytes):
         """Test the transcribe endpoint."""
         # Create test data
         data = {
-            'audio': (BytesIO(b'fake audio data'), 'test.wav')
+            'audio': (BytesIO(sample_audio_bytes), 'test.wav')
         }
         
         response = client.post('/api/transcribe', data=data)
@@ -55,7 +99,31 @@ class TestFlaskAPI:
         assert response.status_code == 200
         assert response.json['transcription'] == "What is in this image?"
         assert 'audio_path' in response.json
-        assert mock_model_manager.transcribe_audio.called
+        assert mock_model_manager.transcribe_batch.called
+    
+    def test_transcribe_rejects_oversized_upload(self, client, mock_model_manager, sample_audio_bytes, monkeypatch):
+        """Test that bodies over MAX_CONTENT_LENGTH get a JSON 413 from the error handler."""
+        monkeypatch.setitem(app.config, 'MAX_CONTENT_LENGTH', 16)
+        data = {
+            'audio': (BytesIO(sample_audio_bytes), 'test.wav')
+        }
+        
+        response = client.post('/api/transcribe', data=data)
+        
+        assert response.status_code == 413
+        assert response.json['error'] == 'Upload too large'
+        assert not mock_model_manager.transcribe_batch.called
+    
+    def test_transcribe_rejects_non_audio(self, client, mock_model_manager):
+        """Test that uploads without a known audio signature are rejected with 415."""
+        data = {
+            'audio': (BytesIO(b'fake audio data'), 'test.wav')
+        }
+        
+        response = client.post('/api/transcribe', data=data)
+        
+        assert response.status_code == 415
+        assert not mock_model_manager.transcribe_batch.called
     
     def test_generate_response(self, client, mock_model_manager):
         """Test the generate_response endpoint."""
@@ -88,6 +156,54 @@ class TestFlaskAPI:
         assert response.status_code == 200
         assert response.json['audio_response'] == "response_audio.wav"
         assert mock_model_manager.text_to_speech.called
+
+    def test_text_to_speech_cache_hit(self, client, mock_model_manager):
+        """Test that repeated TTS requests are served from the cache."""
+        json_data = {
+            'text': 'The image contains a cat.',
+            'voice': 'af_heart',
+            'speed': 1.0
+        }
+        
+        with patch('os.path.exists', return_value=True), \
+             patch('os.path.getsize', return_value=1024):
+            first = client.post('/api/text_to_speech', json=json_data)
+            second = client.post('/api/text_to_speech', json=json_data)
+        
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert second.json['audio_response'] == "response_audio.wav"
+        assert mock_model_manager.text_to_speech.call_count == 1
+    
+    def test_text_to_speech_stream(self, client, mock_model_manager):
+        """Test that the stream endpoint sends a WAV header followed by PCM for each chunk."""
+        mock_model_manager.stream_speech.return_value = iter([np.zeros(4, dtype=np.float32)])
+        
+        response = client.post('/api/text_to_speech/stream', json={'text': 'Hello there.', 'voice': 'af_heart'})
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'audio/wav'
+        assert response.data.startswith(b'RIFF')
+        assert len(response.data) == 44 + 4 * 2
+    
+    def test_text_to_speech_stream_rejects_unknown_voice(self, client, mock_model_manager):
+        """Test that the stream endpoint validates the voice before streaming anything."""
+        response = client.post('/api/text_to_speech/stream', json={'text': 'Hello there.', 'voice': 'not_a_voice'})
+        
+        assert response.status_code == 400
+        assert not mock_model_manager.stream_speech.called
+    
+    def test_text_to_speech_stream_failure_mid_stream(self, client, mock_model_manager):
+        """Test that a synthesis error after the headers are sent ends the stream instead of escaping."""
+        def failing_chunks():
+            yield np.zeros(4, dtype=np.float32)
+            raise RuntimeError("Kokoro failed")
+        mock_model_manager.stream_speech.return_value = failing_chunks()
+        
+        response = client.post('/api/text_to_speech/stream', json={'text': 'Hello there.', 'voice': 'af_heart'})
+        
+        assert response.status_code == 200
+        assert len(response.data) == 44 + 4 * 2
     
     def test_get_voices(self, client, mock_model_manager):
         """Test the get_voices endpoint."""
@@ -95,22 +211,38 @@ class TestFlaskAPI:
         
         assert response.status_code == 200
         assert "af_heart" in response.json
-        assert mock_model_manager.get_available_voices.called
+        assert response.headers['ETag']
+    
+    def test_get_voices_not_modified(self, client):
+        """Test that a matching If-None-Match returns 304 without a body."""
+        etag = client.get('/api/voices').headers['ETag']
+        
+        response = client.get('/api/voices', headers={'If-None-Match': etag})
+        
+        assert response.status_code == 304
+        assert response.data == b''
+    
+    def test_get_voices_not_modified_when_compressed(self, client):
+        """Test that the ETag of a Brotli-compressed response still revalidates to 304."""
+        headers = {'Accept-Encoding': 'br'}
+        first = client.get('/api/voices', headers=headers)
+        assert first.headers['Content-Encoding'] == 'br'
+        
+        response = client.get('/api/voices', headers={**headers, 'If-None-Match': first.headers['ETag']})
+        
+        assert response.status_code == 304
+        assert response.data == b''
     
     def test_get_voices_by_language(self, client, mock_model_manager):
         """Test the get_voices_by_language endpoint."""
-        # Set up mock to return in the expected format for the endpoint
-        mock_model_manager.get_voices_by_language.return_value = {"English (African)": ["af_heart"]}
-        mock_model_manager.get_available_voices.return_value = {
-            "af_heart": {"name": "Heart", "gender": "Female"}
-        }
+        from app.backend.utils.kokoro_voices import VOICES_BY_LANGUAGE_FULL
         
         response = client.get('/api/voices_by_language')
         
         assert response.status_code == 200
-        assert "English (African)" in response.json
-        assert mock_model_manager.get_voices_by_language.called
-        assert mock_model_manager.get_available_voices.called
+        assert response.json == VOICES_BY_LANGUAGE_FULL
+        assert {"id": "af_heart", "name": "Heart", "language": "American English", "gender": "Female"} \
+            in response.json["American English"]
     
     def test_process_missing_image(self, client, mock_model_manager):
         """Test process endpoint with missing image."""
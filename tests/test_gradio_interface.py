@@ -1,509 +1,327 @@
 import os
 import pytest
+from types import SimpleNamespace, MappingProxyType
 from unittest.mock import patch, MagicMock
-import gradio as gr
-from app.frontend.gradio_app import launch_gradio
+
+# Gradio components patched while the interface is built
+GR_COMPONENTS = ("Blocks", "Markdown", "Row", "Column", "Image", "Audio", "Button",
+                 "Textbox", "Dropdown", "Slider", "Group")
+
+class MockGrUpdate:
+    """Stand-in for gr.update that records the choices and value it was given."""
+    def __init__(self, **kwargs):
+        self.choices = kwargs.get('choices', [])
+        self.value = kwargs.get('value', None)
+
+# Backend response bodies, built once and shared read-only by the tests
+_TRANSCRIBE_OK = MappingProxyType({
+    'transcription': 'What is in this image?',
+    'audio_path': 'path/to/saved/audio.wav'
+})
+_GENERATE_OK = MappingProxyType({'response': 'The image shows a cat.'})
+_TTS_OK = MappingProxyType({'audio_response': 'response.wav'})
+_PROCESS_OK = MappingProxyType({
+    'transcription': 'What is in this image?',
+    'response': 'The image shows a cat.',
+    'audio_response': 'response.wav'
+})
+_VOICES_OK = MappingProxyType({
+    "English (African)": (
+        {"id": "af_heart", "name": "Heart", "gender": "Female"},
+    )
+})
+
+def _resp(status=200, payload=None, text=""):
+    """Build a lightweight stand-in for a requests.Response."""
+    response = SimpleNamespace(status_code=status, text=text)
+    response.json = lambda: payload
+    return response
+
+# Voice labels offered for the one language these tests use
+_VOICES = MappingProxyType({
+    "English (African)": MappingProxyType({"Heart (Female)": "af_heart"})
+})
+
+# Frontend request helpers under test; each takes the (mocked) requests module to call through
+
+def _transcribe(requests_mod, audio):
+    if audio is None:
+        return "Please record your question."
+    
+    # Use our mock instead of real file operations
+    try:
+        response = requests_mod.post("http://localhost:5000/api/transcribe", 
+                                     files={'audio': ('audio.wav', 'mock_file', 'audio/wav')})
+        if response.status_code == 200:
+            result = response.json()
+            return result.get('transcription', 'No transcription available')
+        else:
+            return f"Error: {response.status_code} - {response.text}"
+    except Exception as e:
+        return f"Error communicating with backend: {str(e)}"
+
+def _generate_response(requests_mod, image, transcription):
+    if image is None:
+        return "Please upload an image first."
+        
+    if not transcription or transcription == "Please record your question.":
+        return "Please record your question first."
+    
+    # Use our mock instead of real API call
+    try:
+        response = requests_mod.post("http://localhost:5000/api/generate_response", 
+                                     data={'image_path': image, 'query': transcription})
+        if response.status_code == 200:
+            result = response.json()
+            return result.get('response', 'No response available')
+        else:
+            return f"Error: {response.status_code} - {response.text}"
+    except Exception as e:
+        return f"Error communicating with backend: {str(e)}"
+
+def _update_voice_options(language):
+    labels = list(_VOICES.get(language, ()))
+    return MockGrUpdate(choices=labels, value=labels[0] if labels else None)
+
+def _generate_audio(requests_mod, response_text, language, voice_selection, speed):
+    if not response_text or response_text.startswith("Error") or response_text.startswith("Please"):
+        return None
+    
+    # Get voice ID based on language and voice selection
+    voice_id = _VOICES.get(language, {}).get(voice_selection, "af_heart")
+        
+    # Mock API call
+    try:
+        json_data = {
+            'text': response_text,
+            'voice': voice_id,
+            'speed': speed
+        }
+        response = requests_mod.post("http://localhost:5000/api/text_to_speech", json=json_data)
+        
+        if response.status_code == 200:
+            result = response.json()
+            audio_file = result.get('audio_response')
+            # Use os.path.join with normalized slashes
+            return os.path.join('app/uploads', audio_file).replace('\\', '/') if audio_file else None
+        else:
+            return None
+    except Exception as e:
+        return None
+
+def _process_interaction_guard(image, audio):
+    if image is None:
+        return "Please upload an image first.", "No response without an image.", None
+        
+    if audio is None:
+        return "Please record your question.", "No response without a voice query.", None
+    
+    return None
+
+def _process_interaction(requests_mod, image, audio, language="English (African)", voice="Heart (Female)",
+                         speed=1.0, high_performance=False):
+    missing_input = _process_interaction_guard(image, audio)
+    if missing_input:
+        return missing_input
+    
+    # Mock API call
+    try:
+        response = requests_mod.post("http://localhost:5000/api/process", data={
+            'image': ('test.jpg', 'image_content', 'image/jpeg'),
+            'audio': ('test.wav', 'audio_content', 'audio/wav'),
+            'voice': 'af_heart',
+            'speed': '1.0',
+            'high_performance': str(high_performance).lower()
+        })
+        
+        if response.status_code == 200:
+            result = response.json()
+            transcription = result.get('transcription')
+            response_text = result.get('response')
+            audio_path = os.path.join('app/uploads', result.get('audio_response')).replace('\\', '/')
+            return transcription, response_text, audio_path
+        else:
+            return f"Error: {response.status_code} - {response.text}", "", None
+    except Exception as e:
+        return f"Error communicating with backend: {str(e)}", "", None
 
 class TestGradioInterface:
     """Test suite for the Gradio interface."""
     
     @pytest.fixture
-    def mock_requests(self):
-        """Mock requests module for testing."""
-        with patch('app.frontend.gradio_app.requests') as mock:
-            # Mock voices API response
-            voices_response = MagicMock()
-            voices_response.status_code = 200
-            voices_response.json.return_value = {
-                "English (African)": [
-                    {"id": "af_heart", "name": "Heart", "gender": "Female"}
-                ]
-            }
-            mock.get.return_value = voices_response
-            yield mock
+    def mock_requests(self, monkeypatch):
+        """Mock requests module for testing, with no responses configured."""
+        mock = MagicMock()
+        monkeypatch.setattr('app.frontend.gradio_app.requests', mock)
+        return mock
     
     @pytest.fixture
-    def mock_gr_interface(self):
-        """Mock Gradio interface components."""
-        # Create a more extensive mock for gr.update
-        class MockGrUpdate:
-            def __init__(self, **kwargs):
-                self.choices = kwargs.get('choices', [])
-                self.value = kwargs.get('value', None)
-        
-        # Patch gr.update
-        with patch('app.frontend.gradio_app.gr.update', MockGrUpdate), \
-             patch('app.frontend.gradio_app.gr.Blocks', autospec=True) as mock_blocks, \
-             patch('app.frontend.gradio_app.gr.Markdown', autospec=True) as mock_md, \
-             patch('app.frontend.gradio_app.gr.Row', autospec=True) as mock_row, \
-             patch('app.frontend.gradio_app.gr.Column', autospec=True) as mock_column, \
-             patch('app.frontend.gradio_app.gr.Image', autospec=True) as mock_image, \
-             patch('app.frontend.gradio_app.gr.Audio', autospec=True) as mock_audio, \
-             patch('app.frontend.gradio_app.gr.Button', autospec=True) as mock_button, \
-             patch('app.frontend.gradio_app.gr.Textbox', autospec=True) as mock_textbox, \
-             patch('app.frontend.gradio_app.gr.Dropdown', autospec=True) as mock_dropdown, \
-             patch('app.frontend.gradio_app.gr.Slider', autospec=True) as mock_slider, \
-             patch('app.frontend.gradio_app.gr.Group', autospec=True) as mock_group:
-            
-            # Configure mock blocks for context manager
-            mock_blocks_instance = MagicMock()
-            mock_blocks.return_value.__enter__.return_value = mock_blocks_instance
-            
-            # Configure click handlers that will actually be called in tests
-            def mock_click(*args, **kwargs):
-                # Store the function in the mock for testing
-                mock_blocks_instance.process_interaction = args[0] if args else None
-                mock_blocks_instance.generate_audio_response = args[0] if len(args) > 1 else None
-                return mock_blocks_instance
-            
-            # Configure change handlers
-            def mock_change(*args, **kwargs):
-                # Store the function in the mock for testing
-                for arg in args:
-                    if callable(arg):
-                        if arg.__name__ == 'transcribe_audio_query':
-                            mock_blocks_instance.transcribe_audio_query = arg
-                        elif arg.__name__ == 'update_voice_options':
-                            mock_blocks_instance.update_voice_options = arg
-                return mock_blocks_instance
-            
-            mock_blocks_instance.click = mock_click
-            mock_blocks_instance.change = mock_change
-            
-            yield {
-                'blocks': mock_blocks,
-                'blocks_instance': mock_blocks_instance,
-                'markdown': mock_md,
-                'row': mock_row,
-                'column': mock_column,
-                'image': mock_image,
-                'audio': mock_audio,
-                'button': mock_button,
-                'textbox': mock_textbox,
-                'dropdown': mock_dropdown,
-                'slider': mock_slider,
-                'group': mock_group,
-                'update': MockGrUpdate
-            }
+    def mock_requests_with_voices(self, mock_requests):
+        """Mock requests module that also answers the voices API used while building the interface."""
+        # Mock voices API response
+        mock_requests.get.return_value = _resp(200, _VOICES_OK)
+        return mock_requests
     
-    def test_launch_gradio_interface_creation(self, mock_gr_interface, mock_requests):
+    @pytest.fixture
+    def mock_gr_blocks(self, monkeypatch):
+        """Mock the Gradio layout and input components used to build the interface."""
+        mocks = {}
+        for name in GR_COMPONENTS:
+            # Plain mocks: the tests only check .called, so signature specs would be wasted work
+            mocks[name.lower()] = MagicMock()
+            monkeypatch.setattr(f'app.frontend.gradio_app.gr.{name}', mocks[name.lower()])
+        
+        # Configure mock blocks for context manager; launch() is the only call made on it
+        mock_blocks_instance = SimpleNamespace(launch=MagicMock())
+        mocks['blocks'].return_value.__enter__.return_value = mock_blocks_instance
+        
+        # Configure click handlers that will actually be called in tests
+        def mock_click(*args, **kwargs):
+            # Store the function in the mock for testing
+            mock_blocks_instance.process_interaction = args[0] if args else None
+            mock_blocks_instance.generate_audio_response = args[0] if len(args) > 1 else None
+            return mock_blocks_instance
+        
+        # Configure change handlers
+        def mock_change(*args, **kwargs):
+            # Store the function in the mock for testing
+            for arg in args:
+                if callable(arg):
+                    if arg.__name__ == 'transcribe_audio_query':
+                        mock_blocks_instance.transcribe_audio_query = arg
+                    elif arg.__name__ == 'update_voice_options':
+                        mock_blocks_instance.update_voice_options = arg
+            return mock_blocks_instance
+        
+        mock_blocks_instance.click = mock_click
+        mock_blocks_instance.change = mock_change
+        mocks['blocks_instance'] = mock_blocks_instance
+        
+        return mocks
+    
+    def test_launch_gradio_interface_creation(self, mock_gr_blocks, mock_requests_with_voices):
         """Test that the Gradio interface is created correctly."""
+        # Imported here so collecting the other tests does not load the frontend
+        from app.frontend.gradio_app import launch_gradio
+        
         # Suppress the actual launch
         with patch('app.frontend.gradio_app.gr.Blocks.launch'):
             # Call the function
             interface = launch_gradio()
             
             # Verify interface components
-            assert mock_gr_interface['blocks'].called
-            assert mock_gr_interface['markdown'].called
-            assert mock_gr_interface['row'].called
-            assert mock_gr_interface['column'].called
-            assert mock_gr_interface['image'].called
-            assert mock_gr_interface['audio'].called
-            assert mock_gr_interface['button'].called
-            assert mock_gr_interface['textbox'].called
-            assert mock_gr_interface['dropdown'].called
-            assert mock_gr_interface['slider'].called
-            assert mock_gr_interface['group'].called
+            assert mock_gr_blocks['blocks'].called
+            assert mock_gr_blocks['markdown'].called
+            assert mock_gr_blocks['row'].called
+            assert mock_gr_blocks['column'].called
+            assert mock_gr_blocks['image'].called
+            assert mock_gr_blocks['audio'].called
+            assert mock_gr_blocks['button'].called
+            assert mock_gr_blocks['textbox'].called
+            assert mock_gr_blocks['dropdown'].called
+            assert mock_gr_blocks['slider'].called
+            assert mock_gr_blocks['group'].called
             
             # Verify launch was called
             assert interface.launch.called
     
-    def test_transcribe_audio_query(self, mock_requests, mock_gr_interface):
+    def test_transcribe_audio_query(self, mock_requests):
         """Test the transcribe_audio_query function."""
         # Configure the mock response
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            'transcription': 'What is in this image?',
-            'audio_path': 'path/to/saved/audio.wav'
-        }
-        mock_requests.post.return_value = mock_response
+        mock_requests.post.return_value = _resp(200, _TRANSCRIBE_OK)
         
-        # Access the interface but instead of extracting the function,
-        # implement it directly here for testing
-        with patch('app.frontend.gradio_app.gr.Blocks.launch'):
-            # Create manually the function to test
-            def transcribe_audio_query(audio):
-                if audio is None:
-                    return "Please record your question."
-                
-                # Use our mock instead of real file operations
-                try:
-                    response = mock_requests.post("http://localhost:5000/api/transcribe", 
-                                                files={'audio': ('audio.wav', 'mock_file', 'audio/wav')})
-                    if response.status_code == 200:
-                        result = response.json()
-                        transcription = result.get('transcription', 'No transcription available')
-                        return transcription
-                    else:
-                        return f"Error: {response.status_code} - {response.text}"
-                except Exception as e:
-                    return f"Error communicating with backend: {str(e)}"
-            
-            # Test with valid audio
-            result = transcribe_audio_query("audio.wav")
-            
-            # Verify the result
-            assert result == "What is in this image?"
-            assert mock_requests.post.called
-            
-            # Test with no audio
-            result = transcribe_audio_query(None)
-            assert "Please record your question" in result
+        # Test with valid audio
+        result = _transcribe(mock_requests, "audio.wav")
+        
+        # Verify the result
+        assert result == "What is in this image?"
+        assert mock_requests.post.called
+        
+        # Test with no audio
+        result = _transcribe(mock_requests, None)
+        assert "Please record your question" in result
     
-    def test_generate_model_response(self, mock_requests, mock_gr_interface):
+    def test_generate_model_response(self, mock_requests):
         """Test the generate_model_response function."""
         # Configure mock response
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            'response': 'The image shows a cat.'
-        }
-        mock_requests.post.return_value = mock_response
-        
-        # Define the function for testing
-        def generate_model_response(image, transcription):
-            if image is None:
-                return "Please upload an image first."
-                
-            if not transcription or transcription == "Please record your question.":
-                return "Please record your question first."
-            
-            # Use our mock instead of real API call
-            try:
-                response = mock_requests.post("http://localhost:5000/api/generate_response", 
-                                             data={'image_path': image, 'query': transcription})
-                if response.status_code == 200:
-                    result = response.json()
-                    return result.get('response', 'No response available')
-                else:
-                    return f"Error: {response.status_code} - {response.text}"
-            except Exception as e:
-                return f"Error communicating with backend: {str(e)}"
+        mock_requests.post.return_value = _resp(200, _GENERATE_OK)
         
         # Test with image and transcription
-        result = generate_model_response("image.jpg", "What's in this image?")
+        result = _generate_response(mock_requests, "image.jpg", "What's in this image?")
         assert result == "The image shows a cat."
         assert mock_requests.post.called
         
         # Test with no image
-        result = generate_model_response(None, "What's in this image?")
+        result = _generate_response(mock_requests, None, "What's in this image?")
         assert "Please upload an image first" in result
         
         # Test with no transcription
-        result = generate_model_response("image.jpg", "")
+        result = _generate_response(mock_requests, "image.jpg", "")
         assert "Please record your question first" in result
     
-    def test_update_voice_options(self, mock_requests, mock_gr_interface):
+    def test_update_voice_options(self):
         """Test the update_voice_options function."""
-        # Define a function that matches what would be in the interface
-        def update_voice_options(language):
-            voices_options = {
-                "English (African)": {"Heart (Female)": "af_heart"}
-            }
-            if language in voices_options:
-                voices = voices_options[language]
-                default_voice = list(voices.keys())[0] if voices else None
-                return mock_gr_interface['update'](choices=list(voices.keys()), value=default_voice)
-            else:
-                return mock_gr_interface['update'](choices=[], value=None)
-        
         # Test with valid language
-        result = update_voice_options("English (African)")
-        assert isinstance(result, mock_gr_interface['update'])
+        result = _update_voice_options("English (African)")
+        assert isinstance(result, MockGrUpdate)
         assert result.choices == ["Heart (Female)"]
         assert result.value == "Heart (Female)"
         
         # Test with invalid language
-        result = update_voice_options("Nonexistent Language")
-        assert isinstance(result, mock_gr_interface['update'])
+        result = _update_voice_options("Nonexistent Language")
+        assert isinstance(result, MockGrUpdate)
         assert result.choices == []
         assert result.value is None
     
-    @patch('builtins.open', new_callable=MagicMock)
-    def test_generate_audio_response(self, mock_open, mock_requests, mock_gr_interface):
+    def test_generate_audio_response(self, mock_requests):
         """Test the generate_audio_response function."""
         # Configure mock response
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            'audio_response': 'response.wav'
-        }
-        mock_requests.post.return_value = mock_response
-        
-        # Mock open to avoid file operations
-        mock_open.return_value = MagicMock()
-        
-        # Define the function for testing
-        def generate_audio_response(response_text, language, voice_selection, speed):
-            voices_options = {
-                "English (African)": {"Heart (Female)": "af_heart"}
-            }
-            
-            if not response_text or response_text.startswith("Error") or response_text.startswith("Please"):
-                return None
-            
-            # Get voice ID based on language and voice selection
-            voice_id = voices_options.get(language, {}).get(voice_selection, "af_heart")
-                
-            # Mock API call
-            try:
-                json_data = {
-                    'text': response_text,
-                    'voice': voice_id,
-                    'speed': speed
-                }
-                response = mock_requests.post("http://localhost:5000/api/text_to_speech", json=json_data)
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    audio_file = result.get('audio_response')
-                    # Use os.path.join with normalized slashes
-                    audio_response_path = os.path.join('app/uploads', audio_file).replace('\\', '/') if audio_file else None
-                    return audio_response_path
-                else:
-                    return None
-            except Exception as e:
-                return None
+        mock_requests.post.return_value = _resp(200, _TTS_OK)
         
         # Test with valid response text
-        result = generate_audio_response(
-            "The image shows a cat.", 
-            "English (African)", 
-            "Heart (Female)", 
-            1.0
-        )
+        result = _generate_audio(mock_requests, "The image shows a cat.", "English (African)", "Heart (Female)", 1.0)
         
         assert result == 'app/uploads/response.wav'
         assert mock_requests.post.called
         
         # Test with error response text
-        result = generate_audio_response(
-            "Error: Something went wrong", 
-            "English (African)", 
-            "Heart (Female)", 
-            1.0
-        )
+        result = _generate_audio(mock_requests, "Error: Something went wrong", "English (African)", "Heart (Female)", 1.0)
         
         assert result is None
     
-    def test_process_interaction_with_no_image(self, mock_requests, mock_gr_interface):
-        """Test process_interaction when no image is provided."""
-        # Define a function for testing
-        def process_interaction(image, audio, language="English (African)", voice="Heart (Female)", speed=1.0, high_performance=False):
-            if image is None:
-                return "Please upload an image first.", "No response without an image.", None
-                
-            if audio is None:
-                return "Please record your question.", "No response without a voice query.", None
-            
-            # Mock successful execution
-            return "Mock transcription", "Mock response", None
-        
-        # Test with no image
-        result = process_interaction(None, "audio.wav")
-        
-        # Verify response with no image
-        assert "Please upload an image first." in result[0]
-        assert "No response without an image." in result[1]
-        assert result[2] is None
-    
-    def test_process_interaction_with_no_audio(self, mock_requests, mock_gr_interface):
-        """Test process_interaction when no audio is provided."""
-        # Define a function for testing
-        def process_interaction(image, audio, language="English (African)", voice="Heart (Female)", speed=1.0, high_performance=False):
-            if image is None:
-                return "Please upload an image first.", "No response without an image.", None
-                
-            if audio is None:
-                return "Please record your question.", "No response without a voice query.", None
-            
-            # Mock successful execution
-            return "Mock transcription", "Mock response", None
-        
-        # Test with no audio
-        result = process_interaction("image.jpg", None)
-        
-        # Verify response with no audio
-        assert "Please record your question." in result[0]
-        assert "No response without a voice query." in result[1]
-        assert result[2] is None
-    
-    @patch('builtins.open', new_callable=MagicMock)
-    def test_process_interaction_successful(self, mock_open, mock_requests, mock_gr_interface):
-        """Test successful process_interaction with both image and audio."""
-        # Configure mock response
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {
-            'transcription': 'What is in this image?',
-            'response': 'The image shows a cat.',
-            'audio_response': 'response.wav'
-        }
-        mock_requests.post.return_value = mock_response
-        
-        # Mock open to avoid file operations
-        mock_open.return_value = MagicMock()
-        
-        # Define a function for testing
-        def process_interaction(image, audio, language="English (African)", voice="Heart (Female)", speed=1.0, high_performance=False):
-            if image is None:
-                return "Please upload an image first.", "No response without an image.", None
-                
-            if audio is None:
-                return "Please record your question.", "No response without a voice query.", None
-            
-            # Mock API call
-            try:
-                response = mock_requests.post("http://localhost:5000/api/process", data={
-                    'image': ('test.jpg', 'image_content', 'image/jpeg'),
-                    'audio': ('test.wav', 'audio_content', 'audio/wav'),
-                    'voice': 'af_heart',
-                    'speed': '1.0',
-                    'high_performance': str(high_performance).lower()
-                })
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    transcription = result.get('transcription')
-                    response_text = result.get('response')
-                    audio_path = os.path.join('app/uploads', result.get('audio_response')).replace('\\', '/')
-                    return transcription, response_text, audio_path
-                else:
-                    return f"Error: {response.status_code} - {response.text}", "", None
-            except Exception as e:
-                return f"Error communicating with backend: {str(e)}", "", None
-        
-        # Test with both image and audio, and voice options
-        result = process_interaction(
-            "image.jpg", 
-            "audio.wav",
-            "English (African)",
-            "Heart (Female)",
-            1.0,
-            False
-        )
-        
-        # Verify API call
-        assert mock_requests.post.called
-        
-        # Verify response
-        assert result[0] == 'What is in this image?'
-        assert result[1] == 'The image shows a cat.'
-        assert 'app/uploads/response.wav' in result[2]
-    
-    @patch('builtins.open', new_callable=MagicMock)
-    def test_process_interaction_api_error(self, mock_open, mock_requests, mock_gr_interface):
-        """Test process_interaction when API returns an error."""
-        # Configure mock response for error
-        mock_response = MagicMock()
-        mock_response.status_code = 500
-        mock_response.text = "Internal server error"
-        mock_requests.post.return_value = mock_response
-        
-        # Mock open to avoid file operations
-        mock_open.return_value = MagicMock()
-        
-        # Define a function for testing
-        def process_interaction(image, audio, language="English (African)", voice="Heart (Female)", speed=1.0, high_performance=False):
-            if image is None:
-                return "Please upload an image first.", "No response without an image.", None
-                
-            if audio is None:
-                return "Please record your question.", "No response without a voice query.", None
-            
-            # Mock API call
-            try:
-                response = mock_requests.post("http://localhost:5000/api/process", data={
-                    'image': ('test.jpg', 'image_content', 'image/jpeg'),
-                    'audio': ('test.wav', 'audio_content', 'audio/wav'),
-                    'voice': 'af_heart',
-                    'speed': '1.0',
-                    'high_performance': str(high_performance).lower()
-                })
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    transcription = result.get('transcription')
-                    response_text = result.get('response')
-                    audio_path = os.path.join('app/uploads', result.get('audio_response'))
-                    return transcription, response_text, audio_path
-                else:
-                    return f"Error: {response.status_code} - {response.text}", "", None
-            except Exception as e:
-                return f"Error communicating with backend: {str(e)}", "", None
-        
-        # Test with both image and audio
-        result = process_interaction(
-            "image.jpg", 
-            "audio.wav",
-            "English (African)",
-            "Heart (Female)",
-            1.0,
-            False
-        )
-        
-        # Verify API call
-        assert mock_requests.post.called
-        
-        # Verify error response
-        assert "Error: 500" in result[0]
-        assert "Internal server error" in result[0]
+    @pytest.mark.parametrize("image,audio,idx,msg", [
+        (None, "audio.wav", 0, "Please upload an image first."),
+        (None, "audio.wav", 1, "No response without an image."),
+        ("image.jpg", None, 0, "Please record your question."),
+        ("image.jpg", None, 1, "No response without a voice query."),
+    ], ids=["no_image", "no_image_response", "no_audio", "no_audio_response"])
+    def test_process_interaction_missing_input(self, image, audio, idx, msg):
+        """Test that process_interaction asks for the missing image or audio without producing audio."""
+        result = _process_interaction_guard(image, audio)
+        
+        assert msg in result[idx]
         assert result[2] is None
     
-    @patch('builtins.open', new_callable=MagicMock)
-    def test_process_interaction_exception(self, mock_open, mock_requests, mock_gr_interface):
-        """Test process_interaction when an exception occurs."""
-        # Configure mock to raise an exception
-        mock_requests.post.side_effect = Exception("Connection error")
+    @pytest.mark.parametrize("response_config,expected_fragment", [
+        (dict(status_code=200, json_return=_PROCESS_OK), "What is in this image?"),
+        (dict(status_code=500, text="Internal server error"), "Error: 500 - Internal server error"),
+        (dict(side_effect=Exception("Connection error")), "Error communicating with backend: Connection error"),
+    ], ids=["successful", "api_error", "exception"])
+    def test_process_interaction(self, mock_requests, response_config, expected_fragment):
+        """Test process_interaction with both image and audio for a successful, failing and unreachable backend."""
+        if 'side_effect' in response_config:
+            mock_requests.post.side_effect = response_config['side_effect']
+        else:
+            mock_requests.post.return_value = _resp(response_config['status_code'],
+                                                    response_config.get('json_return'),
+                                                    response_config.get('text', ''))
+        
+        result = _process_interaction(mock_requests, "image.jpg", "audio.wav", "English (African)", "Heart (Female)", 1.0, False)
         
-        # Mock open to avoid file operations
-        mock_open.return_value = MagicMock()
-        
-        # Define a function for testing
-        def process_interaction(image, audio, language="English (African)", voice="Heart (Female)", speed=1.0, high_performance=False):
-            if image is None:
-                return "Please upload an image first.", "No response without an image.", None
-                
-            if audio is None:
-                return "Please record your question.", "No response without a voice query.", None
-            
-            # Mock API call
-            try:
-                response = mock_requests.post("http://localhost:5000/api/process", data={
-                    'image': ('test.jpg', 'image_content', 'image/jpeg'),
-                    'audio': ('test.wav', 'audio_content', 'audio/wav'),
-                    'voice': 'af_heart',
-                    'speed': '1.0',
-                    'high_performance': str(high_performance).lower()
-                })
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    transcription = result.get('transcription')
-                    response_text = result.get('response')
-                    audio_path = os.path.join('app/uploads', result.get('audio_response'))
-                    return transcription, response_text, audio_path
-                else:
-                    return f"Error: {response.status_code} - {response.text}", "", None
-            except Exception as e:
-                return f"Error communicating with backend: {str(e)}", "", None
-        
-        # Test with both image and audio
-        result = process_interaction(
-            "image.jpg", 
-            "audio.wav",
-            "English (African)",
-            "Heart (Female)",
-            1.0,
-            False
-        )
-        
-        # Verify API call
         assert mock_requests.post.called
-        
-        # Verify error response
-        assert "Error communicating with backend" in result[0]
-        assert "Connection error" in result[0]
-        assert result[2] is None 
\ No newline at end of file
+        assert expected_fragment in result[0]
+        if response_config.get('status_code') == 200:
+            assert result[1] == 'The image shows a cat.'
+            assert 'app/uploads/response.wav' in result[2]
+        else:
+            assert result[2] is None
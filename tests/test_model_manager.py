@@ -1,80 +1,172 @@
 import os
+import sys
+import copy
+import shutil
+import uuid
 import pytest
-from unittest.mock import patch, MagicMock
-import torch
+from contextlib import ExitStack
+from collections.abc import Mapping
+from unittest.mock import patch, Mock, DEFAULT
 import numpy as np
+import soundfile as sf
 from PIL import Image
+import app.backend.utils.model_manager as model_manager_module
 from app.backend.utils.model_manager import ModelManager, ensure_kokoro_assets
+from app.backend.utils.cache import LRUCache
+from app.backend.utils.kokoro_voices import AVAILABLE_VOICES, VOICES_BY_LANGUAGE
+
+# Short audio clip shared by the STT and TTS mocks; read-only so no test can alter it for the others
+_FAKE_AUDIO = np.array([0.1, 0.2, 0.3], dtype=np.float32)
+_FAKE_AUDIO.setflags(write=False)
+_FAKE_SR = 16000
+
+# Keep the model tests on a single worker under `pytest -n auto --dist loadgroup`
+pytestmark = pytest.mark.xdist_group("model_manager")
 
 class TestModelManager:
     """Test suite for the ModelManager class."""
 
-    @pytest.fixture
-    def mock_env_vars(self, monkeypatch):
-        """Set up mock environment variables."""
-        monkeypatch.setenv("GOOGLE_API_KEY", "fake-api-key")
-        monkeypatch.setenv("UPLOAD_FOLDER", "tests/test_data")
-        monkeypatch.setenv("KOKORO_ASSETS_DIR", "tests/mock_kokoro_assets")
-        
-    @pytest.fixture
-    def mock_models(self):
-        """Set up mock model responses."""
-        with patch("google.generativeai.GenerativeModel") as mock_genai, \
-             patch("transformers.WhisperProcessor.from_pretrained") as mock_whisper_processor, \
-             patch("transformers.WhisperForConditionalGeneration.from_pretrained") as mock_whisper_model, \
-             patch("app.backend.utils.model_manager.KPipeline") as mock_kokoro_pipeline, \
-             patch("google.generativeai.configure") as mock_genai_configure, \
-             patch("app.backend.utils.model_manager.ensure_kokoro_assets") as mock_ensure_kokoro:
+    @pytest.fixture(scope="class")
+    def upload_folder(self, tmp_path_factory):
+        """Per-worker uploads folder, so parallel pytest-xdist workers never share files."""
+        return str(tmp_path_factory.mktemp("uploads"))
+    
+    @pytest.fixture(scope="class", autouse=True)
+    def mock_env_vars(self, upload_folder):
+        """Set up mock environment variables once for the class, restoring os.environ afterwards."""
+        with patch.dict(os.environ, {
+            "GOOGLE_API_KEY": "fake-api-key",
+            "UPLOAD_FOLDER": upload_folder,
+            "KOKORO_ASSETS_DIR": "tests/mock_kokoro_assets",
+        }):
+            yield
+    
+    @pytest.fixture(scope="class")
+    def class_mock_models(self, model_stubs):
+        """Stub the model libraries and patch the Kokoro asset download once for the whole class."""
+        stubs = model_stubs
+        # conftest installs the stubs at import time unless VV_FAST_TESTS=0; only swap in
+        # the missing ones, so teardown never evicts modules (e.g. torch) imported meanwhile
+        with pytest.MonkeyPatch.context() as mp, \
+             patch.multiple(model_manager_module, ensure_kokoro_assets=DEFAULT) as local_mocks:
+            for name, stub in stubs.items():
+                if sys.modules.get(name) is not stub:
+                    mp.setitem(sys.modules, name, stub)
+            transformers, genai = stubs["transformers"], stubs["google.generativeai"]
+            mocks = {
+                "genai": genai.GenerativeModel,
+                "whisper_processor": transformers.WhisperProcessor.from_pretrained,
+                "whisper_model": transformers.WhisperForConditionalGeneration.from_pretrained,
+                "kokoro_pipeline": stubs["kokoro"].KPipeline,
+                "genai_configure": genai.configure,
+                "ensure_kokoro": local_mocks["ensure_kokoro_assets"],
+            }
             
             # Configure mocks
-            mock_whisper_processor.return_value = MagicMock()
-            mock_whisper_model.return_value = MagicMock()
+            mocks["whisper_processor"].return_value = Mock()
+            mocks["whisper_model"].return_value = Mock()
             # Mock KPipeline as a callable that returns a callable
-            mock_pipeline_instance = MagicMock()
-            mock_pipeline_instance.called = False
-            mock_kokoro_pipeline.return_value = mock_pipeline_instance
-            def side_effect(*args, **kwargs):
-                mock_pipeline_instance.called = True
-                return [(None, None, np.array([0.1, 0.2, 0.3]))]
-            mock_pipeline_instance.side_effect = side_effect
+            mock_pipeline_instance = Mock(return_value=[(None, None, _FAKE_AUDIO)])
+            mocks["kokoro_pipeline"].return_value = mock_pipeline_instance
             
-            mock_genai.return_value = MagicMock()
-            mock_ensure_kokoro.return_value = ("mock_model_path.pth", "mock_config.json", "mock_voices_dir")
+            mocks["genai"].return_value = Mock()
+            mocks["ensure_kokoro"].return_value = ("mock_model_path.pth", "mock_config.json", "mock_voices_dir")
             
-            yield {
-                "genai": mock_genai,
-                "whisper_processor": mock_whisper_processor,
-                "whisper_model": mock_whisper_model,
-                "kokoro_pipeline": mock_kokoro_pipeline,
-                "genai_configure": mock_genai_configure,
-                "ensure_kokoro": mock_ensure_kokoro
-            }
+            yield mocks
+    
+    @pytest.fixture
+    def mock_models(self, class_mock_models):
+        """
+        Hand each test the shared model mocks with their call history cleared.
+        Tests may reassign attributes on a ModelManager freely, but must not
+        reconfigure these shared mocks' return values.
+        """
+        for mock in class_mock_models.values():
+            # Keeps configured return values and side effects, drops calls from earlier tests
+            mock.reset_mock()
+        return copy.copy(class_mock_models)
+    
+    @pytest.fixture(scope="class")
+    def model_manager_template(self, class_mock_models, upload_folder):
+        """Construct one ModelManager for the class; tests get shallow copies of it."""
+        return ModelManager(upload_folder=upload_folder)
+    
+    @pytest.fixture
+    def model_manager(self, model_manager_template, mock_models):
+        """
+        Give each test a shallow copy of the template ModelManager with fresh
+        model mocks and empty memo caches, so no state leaks between tests.
+        """
+        mm = copy.copy(model_manager_template)
+        mm.stt_processor = Mock()
+        mm.stt_model = Mock()
+        mm.gemini_model = Mock()
+        mm.kokoro_pipeline = Mock()
+        mm._voice_cache = {}
+        mm._transcriptions = LRUCache()
+        mm._image_analyses = LRUCache()
+        return mm
+    
+    @pytest.fixture(scope="class")
+    def uploaded_image(self, sample_image, upload_folder):
+        """Copy the sample image into the uploads folder, the only place images are read from."""
+        path = os.path.join(upload_folder, "test_image.jpg")
+        shutil.copyfile(sample_image, path)
+        return path
+    
+    @pytest.fixture
+    def rigged_kokoro(self, model_manager):
+        """Install a Kokoro pipeline mock on model_manager that yields one short audio chunk."""
+        pipeline = Mock(return_value=[(None, None, _FAKE_AUDIO)])
+        model_manager.kokoro_pipeline = pipeline
+        return pipeline
     
-    def test_initialization(self, mock_env_vars, mock_models):
+    def test_initialization(self, mock_env_vars, mock_models, upload_folder):
         """Test that the ModelManager initializes correctly."""
-        model_manager = ModelManager(upload_folder="tests/test_data")
+        model_manager = ModelManager(upload_folder=upload_folder)
+        
+        # Models are loaded lazily until preload() (or first use)
+        assert not mock_models["whisper_model"].called
+        assert not model_manager.is_ready()
+        model_manager.preload()
         
         # Verify that the models are loaded
         assert mock_models["whisper_processor"].called
         assert mock_models["whisper_model"].called
-        assert mock_models["kokoro_pipeline"].called  # KPipeline should be called during init
+        assert mock_models["kokoro_pipeline"].called  # KPipeline should be called during preload
         assert mock_models["genai_configure"].called
         assert mock_models["genai"].called
         assert mock_models["ensure_kokoro"].called
-        assert model_manager.upload_folder == "tests/test_data"
+        assert model_manager.upload_folder == upload_folder
+        assert model_manager.is_ready()
+        assert model_manager.load_error() is None
+    
+    def test_rejects_float16_stt_dtype(self, mock_env_vars, upload_folder):
+        """Test that STT_DTYPE=float16 is refused, since Whisper always runs on CPU."""
+        with patch.dict(model_manager_module.config, {"GOOGLE_API_KEY": "fake-api-key", "STT_DTYPE": "float16"}):
+            with pytest.raises(ValueError, match="STT_DTYPE"):
+                ModelManager(upload_folder=upload_folder)
     
-    @patch("soundfile.read")
-    def test_transcribe_audio(self, mock_sf_read, mock_env_vars, mock_models):
+    def test_preload_records_load_failure(self, mock_env_vars, mock_models, upload_folder):
+        """Test that a model failing to load is recorded instead of escaping preload()."""
+        model_manager = ModelManager(upload_folder=upload_folder)
+        
+        with patch.object(model_manager, "_load_kokoro", side_effect=RuntimeError("Kokoro assets unavailable")):
+            model_manager.preload()
+        
+        assert not model_manager.is_ready()
+        assert model_manager.load_error() == "Kokoro assets unavailable"
+    
+    @patch.object(sf, "read")
+    def test_transcribe_audio(self, mock_sf_read, mock_env_vars, mock_models, model_manager):
         """Test audio transcription."""
         # Setup
-        mock_sf_read.return_value = (np.array([0.1, 0.2, 0.3]), 16000)
-        
-        model_manager = ModelManager()
+        mock_sf_read.return_value = (_FAKE_AUDIO, _FAKE_SR)
         
         # Correctly prepare the Whisper processor mock to return a tensor with a shape attribute
-        input_features_mock = MagicMock()
+        input_features_mock = Mock()
         input_features_mock.shape = [-1, 3000]
-        model_manager.stt_processor.return_value.input_features = input_features_mock
+        model_manager.stt_processor.feature_extractor.return_value.input_features = input_features_mock
         
         # Mock the Whisper model's generate and batch_decode methods
         model_manager.stt_model.generate.return_value = "mock_ids"
@@ -89,102 +181,144 @@ class TestModelManager:
         assert model_manager.stt_model.generate.called
         assert model_manager.stt_processor.batch_decode.called
     
-    @patch("PIL.Image.open")
-    def test_process_image_and_query(self, mock_image_open, mock_env_vars, mock_models):
-        """Test image and query processing."""
-        # Setup
-        mock_image = MagicMock()
-        mock_image_open.return_value = mock_image
+    @patch.object(sf, "read")
+    def test_transcribe_audio_memoized_by_digest(self, mock_sf_read, mock_env_vars, mock_models, model_manager):
+        """Test that identical uploads (same digest) are only transcribed once."""
+        mock_sf_read.return_value = (_FAKE_AUDIO, _FAKE_SR)
         
-        model_manager = ModelManager()
+        input_features_mock = Mock()
+        input_features_mock.shape = [-1, 3000]
+        model_manager.stt_processor.feature_extractor.return_value.input_features = input_features_mock
+        model_manager.stt_processor.batch_decode.return_value = ["Transcribed text"]
+        
+        first = model_manager.transcribe_audio("mock_audio.wav", digest="abc123")
+        second = model_manager.transcribe_audio("mock_audio.wav", digest="abc123")
+        
+        assert first == second == "Transcribed text"
+        assert model_manager.stt_model.generate.call_count == 1
+    
+    def test_transcribe_audio_faster_whisper(self, mock_env_vars, mock_models, model_manager):
+        """Test transcription through the faster-whisper backend."""
+        model_manager.stt_backend = "faster-whisper"
+        model_manager.fw_model = Mock()
+        model_manager.fw_model.transcribe.return_value = (
+            [Mock(text=" Transcribed"), Mock(text=" text")], None
+        )
         
+        result = model_manager.transcribe_audio("mock_audio.wav")
+        
+        assert result == "Transcribed text"
+        model_manager.fw_model.transcribe.assert_called_once_with(
+            "mock_audio.wav", language="en", beam_size=1, vad_filter=True
+        )
+        assert not mock_models["whisper_model"].called
+    
+    def test_process_image_and_query(self, mock_env_vars, mock_models, uploaded_image, model_manager):
+        """Test image and query processing."""
         # Mock Gemini response
-        mock_response = MagicMock()
+        mock_response = Mock()
         mock_response.text = "This is a test response."
         model_manager.gemini_model.generate_content.return_value = mock_response
         
         # Call the method
-        result = model_manager.process_image_and_query("mock_image.jpg", "What's in this image?")
+        result = model_manager.process_image_and_query(uploaded_image, "What's in this image?")
         
         # Assert
         assert result == "This is a test response."
-        assert mock_image_open.called
         assert model_manager.gemini_model.generate_content.called
         
-        # Check that generate_content was called with image and text
+        # Check that generate_content was called with the raw image bytes and text
         call_args = model_manager.gemini_model.generate_content.call_args[0][0]
         assert len(call_args) == 2
-        assert call_args[0] == mock_image
+        with open(uploaded_image, "rb") as f:
+            assert call_args[0] == {"mime_type": "image/jpeg", "data": f.read()}
         assert "What's in this image?" in call_args[1]
     
-    @patch("uuid.uuid4")
-    @patch("soundfile.write")
-    def test_text_to_speech(self, mock_sf_write, mock_uuid, mock_env_vars, mock_models):
-        """Test text to speech conversion."""
-        # Setup
-        mock_uuid.return_value = "test-uuid"
+    def test_process_image_and_query_memoized(self, mock_env_vars, mock_models, uploaded_image, model_manager):
+        """Test that repeating an (image, query) pair skips the Gemini call."""
+        model_manager.gemini_model.generate_content.return_value = Mock(text="A red square.")
         
-        model_manager = ModelManager()
+        first = model_manager.process_image_and_query(uploaded_image, "What color is it?")
+        second = model_manager.process_image_and_query(uploaded_image, "What color is it?")
         
-        # Configure the mock Kokoro pipeline
-        mock_pipeline_instance = MagicMock()
-        model_manager.kokoro_pipeline = mock_pipeline_instance
-        mock_pipeline_instance.return_value = [(None, None, np.array([0.1, 0.2, 0.3]))]
+        assert first == second == "A red square."
+        assert model_manager.gemini_model.generate_content.call_count == 1
+    
+    def test_preprocess_image_rejects_paths_outside_uploads(self, mock_env_vars, mock_models, sample_image,
+                                                            uploaded_image, model_manager):
+        """Test that client-supplied paths cannot read files outside the upload folder."""
+        escape = os.path.join(os.path.dirname(uploaded_image), os.pardir, "secret.env")
+        for path in (sample_image, escape):
+            with pytest.raises(ValueError, match="upload folder"):
+                model_manager.preprocess_image(path)
+    
+    def test_preprocess_image_rejects_non_images(self, mock_env_vars, mock_models, upload_folder, model_manager):
+        """Test that files in the upload folder are only sent to Gemini if their bytes are an image."""
+        path = os.path.join(upload_folder, "notes.jpg")
+        with open(path, "w") as f:
+            f.write("GOOGLE_API_KEY=secret")
         
-        # Call the method
-        result = model_manager.text_to_speech("This is a test.", voice="af_heart", speed=1.0)
+        with pytest.raises(ValueError, match="Unsupported image format"):
+            model_manager.preprocess_image(path)
+    
+    def test_preprocess_image_reencodes_unsupported_formats(self, mock_env_vars, mock_models, upload_folder,
+                                                           model_manager):
+        """Test that images Gemini cannot take inline (e.g. BMP) are sent as PNG."""
+        path = os.path.join(upload_folder, "test_image.bmp")
+        Image.new('RGB', (10, 10), color='blue').save(path)
+        
+        blob = model_manager.preprocess_image(path)
+        
+        assert blob["mime_type"] == "image/png"
+        assert blob["data"].startswith(b"\x89PNG")
+    
+    @pytest.mark.parametrize("text, expect_clean", [
+        ("This is a test.", False),
+        ("Text with **bold** and *italic*", True),
+    ], ids=["plain", "special_formatting"])
+    def test_text_to_speech(self, mock_env_vars, mock_models, model_manager, rigged_kokoro, text, expect_clean):
+        """Test text to speech conversion, cleaning the text only when it contains formatting."""
+        with ExitStack() as stack:
+            stack.enter_context(patch.object(uuid, "uuid4", return_value=Mock(hex="test-uuid")))
+            mock_sound_file = stack.enter_context(patch.object(sf, "SoundFile"))
+            mock_clean_text = stack.enter_context(
+                patch.object(model_manager_module, "clean_text_for_tts", return_value="Cleaned text")
+            )
+            
+            # Call the method
+            result = model_manager.text_to_speech(text, voice="af_heart", speed=1.0)
         
         # Assert
         assert result == "test-uuid_response.wav"
-        assert mock_pipeline_instance.called
-        assert mock_sf_write.called
+        assert rigged_kokoro.called
+        assert mock_sound_file.return_value.__enter__.return_value.write.called
+        # Plain text skips the markdown/LaTeX cleaning pass entirely
+        assert mock_clean_text.called == expect_clean
     
-    @patch("os.path.exists")
-    def test_text_to_speech_with_special_formatting(self, mock_path_exists, mock_env_vars, mock_models):
-        """Test text to speech with special formatting that needs cleaning."""
-        mock_path_exists.return_value = True
+    def test_prepare_tts_caches_only_local_voice_files(self, mock_env_vars, mock_models, model_manager, tmp_path):
+        """Test that only downloaded voice files are cached, not by-name or unknown-voice fallbacks."""
+        model_manager.voices_dir = str(tmp_path)
         
-        # Create real patch for clean_text_for_tts directly on the module
-        with patch("app.backend.utils.model_manager.clean_text_for_tts") as mock_clean_text:
-            mock_clean_text.return_value = "Cleaned text"
-            
-            model_manager = ModelManager()
-            
-            # Configure mock return value for the kokoro pipeline
-            mock_pipeline_instance = MagicMock()
-            model_manager.kokoro_pipeline = mock_pipeline_instance
-            mock_pipeline_instance.return_value = [(None, None, np.array([0.1, 0.2, 0.3]))]
-            
-            # Call with text containing markdown-like formatting
-            with patch("uuid.uuid4", return_value="test-uuid"), \
-                 patch("soundfile.write") as mock_sf_write:
-                
-                # Pass text with special formatting that should trigger clean_text_for_tts
-                text_with_formatting = "Text with **bold** and *italic*"
-                result = model_manager.text_to_speech(text_with_formatting, voice="af_heart", speed=1.0)
-            
-            # Assert
-            assert result == "test-uuid_response.wav"
-            assert mock_pipeline_instance.called
-            assert mock_sf_write.called
-            assert mock_clean_text.called
+        assert model_manager._prepare_tts("hi", "af_heart") == ("hi", "af_heart")
+        assert model_manager._prepare_tts("hi", "not_a_voice") == ("hi", "af_heart")
+        assert model_manager._voice_cache == {}
+        
+        # Once the asset download lands, the local file is picked up and cached
+        voice_path = tmp_path / "af_heart.pt"
+        voice_path.touch()
+        assert model_manager._prepare_tts("hi", "af_heart") == ("hi", str(voice_path))
+        assert model_manager._voice_cache == {"af_heart": str(voice_path)}
     
-    def test_get_available_voices(self, mock_env_vars, mock_models):
+    def test_get_available_voices(self, mock_env_vars, mock_models, model_manager):
         """Test retrieving available voices."""
-        from app.backend.utils.kokoro_voices import AVAILABLE_VOICES
-        
-        model_manager = ModelManager()
         voices = model_manager.get_available_voices()
         
         assert voices == AVAILABLE_VOICES
-        assert isinstance(voices, dict)
+        assert isinstance(voices, Mapping)
         assert len(voices) > 0
     
-    def test_get_voices_by_language(self, mock_env_vars, mock_models):
+    def test_get_voices_by_language(self, mock_env_vars, mock_models, model_manager):
         """Test retrieving voices organized by language."""
-        from app.backend.utils.kokoro_voices import VOICES_BY_LANGUAGE
-        
-        model_manager = ModelManager()
         voices_by_lang = model_manager.get_voices_by_language()
         
         assert voices_by_lang == VOICES_BY_LANGUAGE
@@ -194,13 +328,13 @@ class TestModelManager:
     def test_ensure_kokoro_assets(self):
         """Test the ensure_kokoro_assets function."""
         # Define a mock function that tracks its calls
-        mock_hf_download = MagicMock(return_value="/mock/path/to/file")
+        mock_hf_download = Mock(return_value="/mock/path/to/file")
         
         # Use a context manager to patch the necessary functions/objects
-        with patch("os.makedirs") as mock_makedirs, \
-             patch("os.path.exists") as mock_path_exists, \
-             patch("app.backend.utils.model_manager.AVAILABLE_VOICES", {"test_voice": {}}), \
-             patch("app.backend.utils.model_manager.hf_hub_download", mock_hf_download):
+        with patch.object(os, "makedirs") as mock_makedirs, \
+             patch.object(os.path, "exists") as mock_path_exists, \
+             patch.object(model_manager_module, "AVAILABLE_VOICES", {"test_voice": {}}), \
+             patch.object(model_manager_module, "hf_hub_download", mock_hf_download):
             
             # Mock path existence checks - all paths should return False to trigger downloads
             mock_path_exists.return_value = False
@@ -215,6 +349,7 @@ class TestModelManager:
             assert mock_hf_download.call_count > 0
             
             # Verify specific calls to download model and config files
-            kokoro_calls = [call for call in mock_hf_download.call_args_list 
-                            if 'kokoro-v1_0.pth' in str(call) or 'config.json' in str(call)]
-            assert len(kokoro_calls) >= 2  # At least model and config file 
\ No newline at end of file
+            kokoro_files = {"kokoro-v1_0.pth", "config.json"}
+            kokoro_calls = sum(1 for call in mock_hf_download.call_args_list
+                               if call.kwargs.get("filename") in kokoro_files)
+            assert kokoro_calls >= 2  # At least model and config file 
\ No newline at end of file
@@ -0,0 +1,39 @@
+import pytest
+from unittest.mock import MagicMock
+from app.backend.services.multimodal_pipeline import MultimodalCorrectionPipeline, SUMMARY_LENGTH_THRESHOLD
+
+class TestMultimodalCorrectionPipeline:
+    """Test suite for the multimodal correction pipeline."""
+
+    @pytest.fixture
+    def mock_manager(self):
+        """Create a mock ModelManager whose Gemini answer is long enough to be summarized for TTS."""
+        manager = MagicMock()
+        manager.process_image_and_query.return_value = "A long answer. " * (SUMMARY_LENGTH_THRESHOLD // 10)
+        manager.gemini_model.generate_content.return_value = MagicMock(text="Short summary.")
+        manager.text_to_speech.return_value = "response_audio.wav"
+        return manager
+
+    @pytest.fixture
+    def mock_tts_cache(self):
+        """Create a TTS cache mock that never has audio cached."""
+        cache = MagicMock()
+        cache.get.return_value = None
+        return cache
+
+    def test_never_mode_only_summarizes_long_answers(self, mock_manager, mock_tts_cache):
+        """Test that CORRECTION_MODE=never leaves a long answer as-is and only summarizes it for TTS."""
+        pipeline = MultimodalCorrectionPipeline(manager=mock_manager, tts_cache=mock_tts_cache,
+                                                correction_mode="never")
+        initial = mock_manager.process_image_and_query.return_value
+
+        results = pipeline.run(image_path="image.jpg", query_text="What is this?", enable_tts=True)
+
+        assert results["correction_applied"] is False
+        assert results["corrected_analysis"] == initial
+        assert results["summary_used"] is True
+        # The only Gemini call after the analysis is the summary, never the verifier
+        prompt = mock_manager.gemini_model.generate_content.call_args[0][0]
+        assert mock_manager.gemini_model.generate_content.call_count == 1
+        assert prompt.startswith("Summarize this text for audio output")
+        mock_manager.text_to_speech.assert_called_once_with("Short summary.", voice="af_heart", speed=1.2)